@@ -1,37 +1,339 @@
 # agents.py - Clean Working Version
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple, Union
 import asyncio
 import logging
 from datetime import datetime
-import json
 import re
 import hashlib
+import codecs
+import copy
+import heapq
+import threading
+import io
+from collections import Counter
 from pathlib import Path
 import os
+import sys
+import time
 
-# External dependencies
-try:
-    import faiss
-    import numpy as np
-    from langchain_openai import OpenAIEmbeddings
-except ImportError:
-    print("⚠️  Some optional dependencies missing - continuing without them")
-
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
+from langchain.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.messages import SystemMessage
+from langchain_core.prompt_values import PromptValue
 from langchain_core.output_parsers import JsonOutputParser
+import aiofiles
+import httpx
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import redis
-import docx
-import PyPDF2
+import tiktoken
+import orjson
 
 from models import InsightData, ThemeCluster, PersonaData, ProcessingStatus, KeyInsightCard, ExecutiveSummary, QuoteWithAttribution
 from config import AgentConfig
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Text preprocessing patterns, compiled once at import
+# Single spaces are already normalized, so only match runs that need rewriting
+_WHITESPACE_RE = re.compile(r' \s+|[^\S ]\s*')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?;:\-\'"()]')
+# Deletion table for the same characters, for the common case of pure-ASCII text
+_ASCII_SPECIAL_CHARS = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if _SPECIAL_CHARS_RE.match(c)
+))
+# Whitespace collapsing removes every newline first, so this can only match at the start
+_SPEAKER_RE = re.compile(r'^([A-Za-z0-9\s]+):\s*')
+_WORD_RE = re.compile(r'\w+')
+# Contractions, expanded so "can't" and "cannot" (or "I'm" and "I am") compare equal
+_CONTRACTION_RE = re.compile(r"\b(?:can(?:no|')t|won't)\b|n't\b|'(m|re|ve|ll|d)\b")
+_CONTRACTIONS = {"m": " am", "re": " are", "ve": " have", "ll": " will", "d": " would"}
+# Words that reverse a quote's meaning however similar the rest of it is
+_NEGATIONS = frozenset({"not", "no", "never", "nothing", "nobody", "none", "neither", "nor", "without"})
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_FALLBACK_FIELD_RE = re.compile(r'^[^\S\n]*(Quote|Theme|Sentiment|Confidence|Context):(.*)$', re.MULTILINE)
+# Words that signal user feedback; chunks without any are not worth an LLM call
+_SIGNAL_RE = re.compile(
+    r"\b(hate|love|confus|frustrat|annoy|difficult|hard|easy|wish|want|need|can't|cannot|"
+    r"problem|issue|bug|slow|like|prefer|feature|goal|expect|struggl|stuck|help|use)\w*",
+    re.IGNORECASE
+)
+
+# Bump whenever extraction, preprocessing or splitting changes the chunks of a file,
+# so chunks cached in Redis by the previous code are not served for the new one
+_CHUNKER_VERSION = 3
+
+# TXT files above this size are decoded in blocks instead of read whole
+_TXT_STREAM_THRESHOLD = 4 * 1024 * 1024
+_TXT_BLOCK_SIZE = 1024 * 1024
+
+# Quotes with the same sentiment and negations whose word and word-pair sets have at
+# least this Jaccard similarity are rewordings ("is hard" / "is really hard", 0.75);
+# one content word changed in a short quote ("phone" / "laptop") stays below it
+_NEAR_DUPLICATE_JACCARD = 0.75
+
+# Quotes whose embeddings have at least this cosine similarity say the same thing
+_SEMANTIC_DUPLICATE_SIMILARITY = 0.9
+
+# Chunks followed by another chunk of the same file with fewer distinct words than this are boilerplate or noise
+_MIN_UNIQUE_WORDS = 20
+
+# Theme priorities from most to least important
+_PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+
+# Non-cryptographic chunk content hash: xxHash3 when installed, BLAKE2b otherwise
+try:
+    import xxhash
+
+    def _content_hash(data: bytes) -> str:
+        return xxhash.xxh3_128_hexdigest(data)
+except ImportError:
+    def _content_hash(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _expand_contraction(match: re.Match) -> str:
+    if match.group(1):
+        return _CONTRACTIONS[match.group(1)]
+    if match.group(0).startswith("can"):
+        return "can not"
+    if match.group(0).startswith("won"):
+        return "will not"
+    return " not"
+
+
+def _quote_words(quote: str) -> List[str]:
+    """Lowercase words of a quote with punctuation dropped and contractions expanded"""
+    return _WORD_RE.findall(_CONTRACTION_RE.sub(_expand_contraction, quote.lower().replace("\u2019", "'")))
+
+
+def _strip_json_fence(content: str) -> str:
+    """Return the body of a ```json fence in an LLM response, or the response itself"""
+    fenced = _JSON_FENCE_RE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    return content.strip()
+
+
+def _split_prompt(prompt: PromptTemplate, variable: str) -> Tuple[str, str]:
+    """Render a single-variable prompt once and return the text before and after the variable"""
+    sentinel = "\x00PROMPT_VARIABLE\x00"
+    prefix, suffix = prompt.format(**{variable: sentinel}).split(sentinel)
+    return prefix, suffix
+
+
+def _loads_llm_json(content: str) -> Any:
+    """Parse JSON from an LLM response with orjson, unwrapping a ```json fence if present"""
+    return orjson.loads(_strip_json_fence(content))
+
+
+def _serialize_model(obj: Any) -> Any:
+    """orjson fallback serializer: dump pydantic models as they are reached"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# Closing section of the legacy executive summary; it never varies
+_EXECUTIVE_SUMMARY_FOOTER = """
+## Recommendations
+
+1. **Immediate Actions:** Address high-priority themes with multiple negative sentiments
+2. **Design Focus:** Consider persona needs in upcoming design decisions
+3. **Further Research:** Investigate themes with medium priority for deeper understanding
+
+---
+
+*This summary was automatically generated by the UX Research Copilot system.*
+"""
+
+# Built once; TypeAdapter construction compiles a validator
+_KEY_INSIGHT_CARDS = TypeAdapter(List[KeyInsightCard])
+_INSIGHTS = TypeAdapter(List[InsightData])
+
+
+# Redis connection pools shared by every agent, keyed by server address
+_REDIS_POOLS: Dict[Tuple[str, int, str], redis.BlockingConnectionPool] = {}
+
+
+# A Redis server that failed its first ping is not retried until this time (monotonic)
+_REDIS_RETRY_AT: Dict[Tuple[str, int, str], float] = {}
+_REDIS_RETRY_INTERVAL = 30.0
+
+
+def get_redis_client(config: AgentConfig) -> redis.Redis:
+    """Return a Redis client backed by a shared connection pool (raises if Redis is unreachable)"""
+    pool_key = (config.redis_host, config.redis_port, config.redis_password)
+    pool = _REDIS_POOLS.get(pool_key)
+    if pool is not None:
+        return redis.Redis(connection_pool=pool)
+
+    # Without this, every agent of every session would wait out a connect timeout
+    if time.monotonic() < _REDIS_RETRY_AT.get(pool_key, 0.0):
+        raise redis.ConnectionError(f"Redis at {config.redis_host}:{config.redis_port} is unavailable")
+
+    # Blocking pool: when every connection is busy (e.g. many ingestion threads at once),
+    # callers wait briefly for one instead of failing with "Too many connections"
+    pool = redis.BlockingConnectionPool(
+        host=config.redis_host,
+        port=config.redis_port,
+        password=config.redis_password if config.redis_password else None,
+        decode_responses=True,
+        max_connections=64,
+        timeout=5,
+        # An unreachable server fails fast instead of hanging on the OS connect timeout
+        socket_connect_timeout=1
+    )
+    client = redis.Redis(connection_pool=pool)
+    # Only ping when the pool is first created; later clients reuse its connections
+    try:
+        client.ping()
+    except redis.RedisError:
+        pool.disconnect()
+        _REDIS_RETRY_AT[pool_key] = time.monotonic() + _REDIS_RETRY_INTERVAL
+        raise
+    _REDIS_POOLS[pool_key] = pool
+    return client
+
+
+# HTTP connection pool shared by every OpenAI-backed client, created on first use
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the async HTTP client shared by all LLM and embedding clients"""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+    return _HTTP_CLIENT
+
+
+def get_chat_model(config: AgentConfig, model: str, **kwargs) -> ChatOpenAI:
+    """Return a chat client for model, or for config.synthesis_model on the server at config.local_model_url"""
+    if config.local_model_url:
+        # Self-hosted OpenAI-compatible servers serve their own model and accept any key
+        return ChatOpenAI(
+            api_key=config.openai_api_key or "local",
+            base_url=config.local_model_url,
+            model=config.synthesis_model,
+            http_async_client=get_http_client(),
+            **kwargs
+        )
+    return ChatOpenAI(api_key=config.openai_api_key, model=model, http_async_client=get_http_client(), **kwargs)
+
+def _preload_vector_libraries():
+    """Import FAISS and NumPy ahead of their first use; loading them takes a noticeable moment"""
+    try:
+        import faiss  # noqa: F401
+        import numpy  # noqa: F401
+    except ImportError:
+        pass  # Callers handle a missing library where they use it
+
+
+# Serializes semantic cache loads and saves across the sessions of this process
+_SEMANTIC_CACHE_LOCK = threading.Lock()
+
+
+def _replace_file(path: Path, write: Callable[[str], None]):
+    """Write a file through a temporary sibling and rename it into place atomically"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        write(str(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class SemanticCache:
+    """LLM responses looked up by embedding similarity of their input, persisted to disk
+
+    Responses are saved before the index, so a reader never sees index ids past the end
+    of the responses list; saves merge into what is on disk instead of overwriting it.
+    """
+
+    def __init__(self, path: Path, threshold: float):
+        import faiss
+
+        self._faiss = faiss
+        self.threshold = threshold
+        self.index_path = path.with_suffix(".faiss")
+        self.responses_path = path.with_suffix(".json")
+        self.index = None
+        self.responses: List[str] = []
+        # Entries added since load(), appended to the on-disk cache by save()
+        self._new_vectors = []
+        self._new_responses: List[str] = []
+
+    def _read(self) -> Tuple[Any, List[str]]:
+        """The saved index and its responses, or (None, []) if there is no usable pair"""
+        if not (self.index_path.exists() and self.responses_path.exists()):
+            return None, []
+        responses = orjson.loads(self.responses_path.read_bytes())
+        index = self._faiss.read_index(str(self.index_path))
+        if index.ntotal > len(responses):
+            return None, []
+        # A newer responses file may already hold entries whose vectors are not saved yet
+        return index, responses[:index.ntotal]
+
+    def load(self):
+        """Read a previously saved index and its responses, if any"""
+        with _SEMANTIC_CACHE_LOCK:
+            self.index, self.responses = self._read()
+        self._new_vectors = []
+        self._new_responses = []
+
+    def _normalize(self, embedding: List[float]):
+        import numpy as np
+
+        vector = np.asarray([embedding], dtype="float32")
+        self._faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, embedding: List[float]) -> Optional[str]:
+        """Return the response cached for the most similar input, if it is similar enough"""
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        scores, ids = self.index.search(self._normalize(embedding), 1)
+        position = int(ids[0][0])
+        if scores[0][0] >= self.threshold and 0 <= position < len(self.responses):
+            return self.responses[position]
+        return None
+
+    def add(self, embedding: List[float], response: str):
+        """Cache a response under its input's embedding"""
+        vector = self._normalize(embedding)
+        if self.index is None:
+            # Inner product over unit vectors is cosine similarity
+            self.index = self._faiss.IndexFlatIP(vector.shape[1])
+        self.index.add(vector)
+        self.responses.append(response)
+        self._new_vectors.append(vector)
+        self._new_responses.append(response)
+
+    def save(self):
+        """Append this run's entries to the cache on disk"""
+        if not self._new_vectors:
+            return
+        with _SEMANTIC_CACHE_LOCK:
+            # Another session may have saved since load(); add to its state, not ours
+            index, responses = self._read()
+            if index is None or index.d != self._new_vectors[0].shape[1]:
+                index = self._faiss.IndexFlatIP(self._new_vectors[0].shape[1])
+                responses = []
+            for vector in self._new_vectors:
+                index.add(vector)
+            responses = responses + self._new_responses
+
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            _replace_file(self.responses_path, lambda tmp: Path(tmp).write_bytes(orjson.dumps(responses)))
+            _replace_file(self.index_path, lambda tmp: self._faiss.write_index(index, tmp))
+
+            self.index, self.responses = index, responses
+        self._new_vectors = []
+        self._new_responses = []
+
 
 # Base Agent Interface
 class BaseAgent(ABC):
@@ -40,47 +342,98 @@ class BaseAgent(ABC):
     def __init__(self, config: AgentConfig, session_id: str):
         self.config = config
         self.session_id = session_id
+        self.session_key = f"session:{session_id}"
         self.logger = logging.getLogger(f"{self.__class__.__name__}")
-        
+        self.redis_client = self._connect_redis()
+
+    def _connect_redis(self) -> Optional[redis.Redis]:
+        """Client from the shared pool, or None when Redis is unreachable"""
         try:
-            has_password = bool(config.redis_password)
-            self.logger.info(f"Connecting to Redis at {config.redis_host}:{config.redis_port} (password: {has_password})")
-            self.redis_client = redis.Redis(
-                host=config.redis_host,
-                port=config.redis_port,
-                password=config.redis_password if config.redis_password else None,
-                decode_responses=True
-            )
-            # Test connection
-            self.redis_client.ping()
-            self.logger.info("Redis connection successful")
+            return get_redis_client(self.config)
         except Exception as e:
-            self.logger.warning(f"Redis connection failed - running without session persistence: {e}")
-            self.redis_client = None
+            self.logger.warning("Redis connection failed - running without session persistence: %s", e)
+            return None
         
+    def for_session(self, session_id: str) -> "BaseAgent":
+        """Return a copy of this agent bound to session_id, sharing its clients and prompts
+
+        Redis is looked up again for every session, so a server that was down when the
+        agent was built is picked up once it is reachable (after get_redis_client's backoff).
+        """
+        agent = copy.copy(self)
+        agent.session_id = session_id
+        agent.session_key = f"session:{session_id}"
+        agent.redis_client = self._connect_redis()
+        return agent
+
     @abstractmethod
     async def process(self, input_data: Any) -> Any:
         """Process input data and return results"""
         pass
     
-    def update_session_status(self, status: ProcessingStatus, **kwargs):
-        """Update session status in Redis"""
+    async def update_session_status(self, status: ProcessingStatus, **kwargs):
+        """Update session status in Redis (the round trip runs in a worker thread)"""
         if not self.redis_client:
             return
             
         try:
-            session_key = f"session:{self.session_id}"
-            session_data = self.redis_client.hgetall(session_key)
-            
-            session_data.update({
+            session_key = self.session_key
+
+            # HSET only touches the given fields, so no read is needed first
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(session_key, mapping={
                 'status': status.value,
                 'updated_at': datetime.now().isoformat(),
                 **kwargs
             })
-            
-            self.redis_client.hset(session_key, mapping=session_data)
+            if self.config.session_ttl:
+                pipe.expire(session_key, self.config.session_ttl)
+            await asyncio.to_thread(pipe.execute)
+        except Exception as e:
+            self.logger.warning("Failed to update session status: %s", e)
+
+    def _llm_cache_key(self, llm: ChatOpenAI, prompt_text: str, prompt_version: str) -> str:
+        """Redis key for a response to this exact prompt under these model settings"""
+        digest = hashlib.sha256(
+            f"{llm.model_name}|{llm.temperature}|{prompt_version}|{prompt_text}".encode()
+        ).hexdigest()
+        return f"llm_cache:{digest}"
+
+    async def _get_cached_responses(self, llm: ChatOpenAI, prompts: List[str], prompt_version: str) -> List[Optional[str]]:
+        """Look up cached responses for many prompts in a single MGET"""
+        if not self.redis_client or not prompts:
+            return [None] * len(prompts)
+        try:
+            # Redis calls run in a worker thread so a slow server never stalls the event loop
+            return await asyncio.to_thread(
+                self.redis_client.mget, [self._llm_cache_key(llm, p, prompt_version) for p in prompts]
+            )
         except Exception as e:
-            self.logger.warning(f"Failed to update session status: {e}")
+            self.logger.warning("LLM cache lookup failed: %s", e)
+            return [None] * len(prompts)
+
+    async def _cached_invoke(self, llm: ChatOpenAI, prompt: Union[str, PromptValue], prompt_version: str) -> str:
+        """Invoke the LLM, serving identical (model, temperature, prompt) requests from Redis"""
+        cache_key = None
+        if self.redis_client:
+            prompt_text = prompt if isinstance(prompt, str) else prompt.to_string()
+            cache_key = self._llm_cache_key(llm, prompt_text, prompt_version)
+            try:
+                cached = await asyncio.to_thread(self.redis_client.get, cache_key)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                self.logger.warning("LLM cache lookup failed: %s", e)
+
+        response = await llm.ainvoke(prompt)
+
+        if cache_key:
+            try:
+                await asyncio.to_thread(self.redis_client.setex, cache_key, self.config.llm_cache_ttl, response.content)
+            except Exception as e:
+                self.logger.warning("LLM cache write failed: %s", e)
+
+        return response.content
 
 # Agent 1: Document Ingestor
 class DocumentIngestor(BaseAgent):
@@ -88,159 +441,286 @@ class DocumentIngestor(BaseAgent):
     
     def __init__(self, config: AgentConfig, session_id: str):
         super().__init__(config, session_id)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config.chunk_size,
-            chunk_overlap=config.chunk_overlap,
-            length_function=len
-        )
+        # Chunks are sized in tokens of the model that will read them
+        self.encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        # Text extractor for each supported file extension
+        self._extractors = {
+            '.pdf': self._extract_from_pdf,
+            '.docx': self._extract_from_docx,
+            '.doc': self._extract_from_docx,
+            '.txt': self._extract_from_txt,
+            '.csv': self._extract_from_csv,
+        }
     
     async def process(self, file_paths: List[str]) -> List[Document]:
         """Process multiple files and return chunked documents"""
-        self.update_session_status(ProcessingStatus.PROCESSING)
+        await self.update_session_status(ProcessingStatus.PROCESSING)
         
         try:
             all_documents = []
-            
-            for file_path in file_paths:
-                documents = await self._process_single_file(file_path)
+
+            # Every file in this run shares one processing timestamp
+            processed_at = datetime.now().isoformat()
+
+            # Parsing is blocking, so run each file in a worker thread concurrently
+            results = await asyncio.gather(*(
+                asyncio.to_thread(self._process_single_file, file_path, processed_at)
+                for file_path in file_paths
+            ))
+            for documents in results:
                 all_documents.extend(documents)
             
-            self.logger.info(f"Processed {len(file_paths)} files into {len(all_documents)} chunks")
+            self.logger.info("Processed %s files into %s chunks", len(file_paths), len(all_documents))
             return all_documents
             
         except Exception as e:
-            self.logger.error(f"Error processing files: {str(e)}")
-            self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
+            self.logger.error("Error processing files: %s", e)
+            await self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
             raise
     
-    async def _process_single_file(self, file_path: str) -> List[Document]:
+    def _process_single_file(self, file_path: str, processed_at: Optional[str] = None) -> List[Document]:
         """Process a single file based on its type"""
         path = Path(file_path)
         
         try:
-            if path.suffix.lower() == '.pdf':
-                text = self._extract_from_pdf(file_path)
-            elif path.suffix.lower() in ['.docx', '.doc']:
-                text = self._extract_from_docx(file_path)
-            elif path.suffix.lower() == '.txt':
-                text = self._extract_from_txt(file_path)
-            elif path.suffix.lower() == '.csv':
-                text = self._extract_from_csv(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {path.suffix}")
-            
-            # Clean and preprocess text
-            text = self._preprocess_text(text)
-            
-            # Create base document with metadata
-            base_doc = Document(
-                page_content=text,
-                metadata={
-                    "source": str(path),
-                    "filename": path.name,
-                    "file_type": path.suffix,
-                    "processed_at": datetime.now().isoformat(),
-                    "session_id": self.session_id
-                }
-            )
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_documents([base_doc])
+            chunks = self._chunk_file(path)
+
+            # Base metadata shared by every chunk of this file
+            base_metadata = {
+                "source": str(path),
+                "filename": path.name,
+                "file_type": path.suffix,
+                "processed_at": processed_at or datetime.now().isoformat(),
+                "session_id": self.session_id
+            }
             
-            # Add chunk-specific metadata
-            for i, chunk in enumerate(chunks):
-                chunk.metadata.update({
+            # Build each chunk with its chunk-specific metadata in a single pass
+            total_chunks = len(chunks)
+            return [
+                Document(page_content=chunk_text, metadata={
+                    **base_metadata,
                     "chunk_id": i,
-                    "total_chunks": len(chunks),
-                    "chunk_hash": hashlib.md5(chunk.page_content.encode()).hexdigest()
+                    "total_chunks": total_chunks,
+                    "overlap_chars": overlap_chars,
+                    "chunk_hash": _content_hash(chunk_text.encode())
                 })
-            
-            return chunks
+                for i, (chunk_text, overlap_chars) in enumerate(chunks)
+            ]
             
         except Exception as e:
-            self.logger.error(f"Error processing {file_path}: {str(e)}")
+            self.logger.error("Error processing %s: %s", file_path, e)
             return []
     
+    def _chunk_file(self, path: Path) -> List[Tuple[str, int]]:
+        """Extract, clean and split a file, reusing the chunks of identical earlier uploads"""
+        cache_key = None
+        if self.redis_client:
+            with open(path, 'rb') as f:
+                digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+            cache_key = (
+                f"doc_chunks:v{_CHUNKER_VERSION}:{self.config.pdf_backend}:"
+                f"{self.config.chunk_size}:{self.config.chunk_overlap}:{path.suffix.lower()}:{digest}"
+            )
+            try:
+                cached = self.redis_client.get(cache_key)
+                if cached is not None:
+                    return orjson.loads(cached)
+            except Exception as e:
+                self.logger.warning("Chunk cache lookup failed: %s", e)
+
+        extractor = self._extractors.get(path.suffix.lower())
+        if not extractor:
+            raise ValueError(f"Unsupported file type: {path.suffix}")
+        text = extractor(str(path))
+
+        # Clean and preprocess text
+        text = self._preprocess_text(text)
+        chunks = self._split_text(text)
+
+        if cache_key:
+            try:
+                self.redis_client.setex(cache_key, self.config.llm_cache_ttl, orjson.dumps(chunks))
+            except Exception as e:
+                self.logger.warning("Chunk cache write failed: %s", e)
+
+        return chunks
+
+    def _split_text(self, text: str) -> List[Tuple[str, int]]:
+        """Split text into overlapping windows of config.chunk_size tokens
+
+        Each window comes with the number of its leading characters that repeat the end
+        of the previous window, so the overlap can be dropped when windows are rejoined.
+        """
+        token_ids = self.encoding.encode(text)
+        if not token_ids:
+            return []
+
+        size = self.config.chunk_size
+        stride = max(size - self.config.chunk_overlap, 1)
+        starts = range(0, max(len(token_ids) - self.config.chunk_overlap, 1), stride)
+        ends = [min(start + size, len(token_ids)) for start in starts]
+        previous_ends = [0, *ends[:-1]]
+
+        # A token can end inside a multibyte character, so non-ASCII text is cut at the
+        # character where each boundary token starts instead of decoding token slices
+        if text.isascii():
+            return [
+                (
+                    self.encoding.decode(token_ids[start:end]),
+                    len(self.encoding.decode(token_ids[start:previous_end])) if previous_end > start else 0
+                )
+                for start, end, previous_end in zip(starts, ends, previous_ends)
+            ]
+
+        text, offsets = self.encoding.decode_with_offsets(token_ids)
+        offsets.append(len(text))
+        return [
+            (text[offsets[start]:offsets[end]], max(offsets[previous_end] - offsets[start], 0))
+            for start, end, previous_end in zip(starts, ends, previous_ends)
+        ]
+    
     def _extract_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
-        text = ""
+        # Native PDFium text extraction when available; PyPDF2 is the fallback
         try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            pdfium = None
+
+        try:
+            # PyMuPDF is opt-in: it is AGPL-licensed and its text layout differs slightly
+            if self.config.pdf_backend == "pymupdf":
+                try:
+                    import fitz
+                except ImportError:
+                    self.logger.warning("PDF_BACKEND=pymupdf but PyMuPDF is not installed")
+                else:
+                    with fitz.open(file_path) as doc:
+                        return "\n".join(page.get_text("text") for page in doc)
+
+            if pdfium is not None:
+                pdf = pdfium.PdfDocument(file_path)
+                try:
+                    return "\n".join(page.get_textpage().get_text_range() for page in pdf)
+                finally:
+                    pdf.close()
+
+            import PyPDF2
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                return "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
         except Exception as e:
-            self.logger.error(f"Error extracting PDF {file_path}: {e}")
+            self.logger.error("Error extracting PDF %s: %s", file_path, e)
             raise
-        return text
     
     def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
+        import docx
         try:
             doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            return "\n".join(paragraph.text for paragraph in doc.paragraphs)
         except Exception as e:
-            self.logger.error(f"Error extracting DOCX {file_path}: {e}")
+            self.logger.error("Error extracting DOCX %s: %s", file_path, e)
             raise
-        return text
     
     def _extract_from_txt(self, file_path: str) -> str:
         """Extract text from TXT file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            path = Path(file_path)
+            if path.stat().st_size <= _TXT_STREAM_THRESHOLD:
+                return path.read_text(encoding='utf-8')
+
+            # Large files: decode block by block so the raw bytes are never held in full,
+            # collapsing whitespace as we go. A run split across two blocks leaves a double
+            # space, which _preprocess_text collapses again, so the result is unchanged
+            with open(path, 'rb', buffering=_TXT_BLOCK_SIZE) as file:
+                blocks = iter(lambda: file.read(_TXT_BLOCK_SIZE), b'')
+                return "".join(
+                    _WHITESPACE_RE.sub(' ', block) for block in codecs.iterdecode(blocks, 'utf-8')
+                )
         except Exception as e:
-            self.logger.error(f"Error extracting TXT {file_path}: {e}")
+            self.logger.error("Error extracting TXT %s: %s", file_path, e)
             raise
 
     def _extract_from_csv(self, file_path: str) -> str:
         """Extract text from CSV file"""
         import csv
         try:
-            text = ""
             with open(file_path, 'r', encoding='utf-8') as file:
                 csv_reader = csv.reader(file)
-                for row in csv_reader:
-                    # Join row values with spaces and add newline
-                    text += " ".join(row) + "\n"
-            return text
+                # Join row values with spaces, one row per line
+                return "\n".join(" ".join(row) for row in csv_reader)
         except Exception as e:
-            self.logger.error(f"Error extracting CSV {file_path}: {e}")
+            self.logger.error("Error extracting CSV %s: %s", file_path, e)
             raise
 
     def _preprocess_text(self, text: str) -> str:
         """Clean and preprocess text"""
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s.,!?;:\-\'"()]', '', text)
+        if text.isascii():
+            text = text.translate(_ASCII_SPECIAL_CHARS)
+        else:
+            text = _SPECIAL_CHARS_RE.sub('', text)
         
         # Normalize speaker patterns
-        text = re.sub(r'^([A-Za-z0-9\s]+):\s*', r'\1: ', text, flags=re.MULTILINE)
+        text = _SPEAKER_RE.sub(r'\1: ', text, count=1)
         
         return text.strip()
 
 # Agent 2: Insight Analyzer
 class InsightAnalyzer(BaseAgent):
     """Extracts key quotes and identifies themes using NLP"""
+
+    # Bump whenever insight_prompt changes so cached LLM responses are invalidated
+    PROMPT_VERSION = "1"
     
     def __init__(self, config: AgentConfig, session_id: str):
         super().__init__(config, session_id)
         
-        if not config.openai_api_key:
+        if not config.openai_api_key and not config.local_model_url:
             raise ValueError("OpenAI API key is required for InsightAnalyzer")
             
-        self.llm = ChatOpenAI(
-            api_key=config.openai_api_key,
-            model="gpt-3.5-turbo",
+        self.llm = get_chat_model(
+            config,
+            "gpt-3.5-turbo",
             temperature=config.temperature,
             max_tokens=config.max_tokens
         )
         self.parser = JsonOutputParser(pydantic_object=InsightData)
         self._setup_prompts()
+
+        # Optional semantic cache: near-duplicate chunks reuse an earlier response
+        self.semantic_cache = None
+        if config.semantic_cache_dir and not config.openai_api_key:
+            self.logger.warning("Semantic cache disabled: OpenAI API key is required for embeddings")
+        elif config.semantic_cache_dir:
+            try:
+                from langchain_openai import OpenAIEmbeddings
+
+                self.embedding_model = OpenAIEmbeddings(
+                    api_key=config.openai_api_key,
+                    model="text-embedding-3-small",
+                    http_async_client=get_http_client()
+                )
+                self.semantic_cache = SemanticCache(
+                    Path(config.semantic_cache_dir) / f"insights_v{self.PROMPT_VERSION}",
+                    config.semantic_cache_threshold
+                )
+            except Exception as e:
+                self.logger.warning("Semantic cache disabled: %s", e)
+
+    def for_session(self, session_id: str) -> "InsightAnalyzer":
+        """Bind to session_id; the semantic cache index is loaded and saved per run, so it is not shared"""
+        agent = super().for_session(session_id)
+        if self.semantic_cache:
+            agent.semantic_cache = SemanticCache(
+                Path(self.config.semantic_cache_dir) / f"insights_v{self.PROMPT_VERSION}",
+                self.config.semantic_cache_threshold
+            )
+        return agent
     
     def _setup_prompts(self):
         """Setup prompts for insight extraction"""
@@ -276,209 +756,197 @@ class InsightAnalyzer(BaseAgent):
             """
         ).partial(format_instructions=self.parser.get_format_instructions())
 
+        # Render the static parts once; each chunk is spliced in between them
+        self._prompt_prefix, self._prompt_suffix = _split_prompt(self.insight_prompt, "text_chunk")
+
     async def process(self, documents: List[Document]) -> List[InsightData]:
         """Process documents and extract insights"""
         try:
             all_insights = []
-            
-            for doc in documents:
-                chunk_insights = await self._analyze_chunk(doc.page_content)
-                all_insights.extend(chunk_insights)
+
+            # A quick scan drops chunks that would only come back as empty insight lists
+            signal_documents = [doc for doc in documents if self._worth_analyzing(doc)]
+            self.logger.info("Skipping %s of %s chunks as low-signal", len(documents) - len(signal_documents), len(documents))
+
+            # Several small chunks share one prompt, amortizing the instruction preamble
+            batches = self._batch_chunks(signal_documents)
+
+            # One round trip finds every batch already answered for this exact prompt
+            cached = await self._get_cached_responses(
+                self.llm, [self._prompt_prefix + text + self._prompt_suffix for text in batches], self.PROMPT_VERSION
+            )
+            misses = [i for i, content in enumerate(cached) if content is None]
+
+            # Embedding the remaining batches is one cheap request next to the LLM calls it can save
+            embeddings = [None] * len(batches)
+            if self.semantic_cache and misses:
+                try:
+                    # Loading the index and embedding the batches overlap; neither blocks the loop
+                    _, vectors = await asyncio.gather(
+                        asyncio.to_thread(self.semantic_cache.load),
+                        self.embedding_model.aembed_documents([batches[i] for i in misses])
+                    )
+                    for i, vector in zip(misses, vectors):
+                        embeddings[i] = vector
+                except Exception as e:
+                    self.logger.warning("Chunk embedding failed, skipping semantic cache: %s", e)
+
+            # Analyze batches concurrently, bounded to stay under the API rate limit
+            semaphore = asyncio.Semaphore(self.config.max_concurrency or 8)
+
+            async def analyze(text: str, embedding: Optional[List[float]], content: Optional[str]) -> List[InsightData]:
+                async with semaphore:
+                    return await self._analyze_chunk(text, embedding, content)
+
+            # _analyze_chunk handles its own errors, so one bad batch never cancels the group
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(analyze(text, embedding, content))
+                    for text, embedding, content in zip(batches, embeddings, cached)
+                ]
+
+            if self.semantic_cache:
+                try:
+                    await asyncio.to_thread(self.semantic_cache.save)
+                except Exception as e:
+                    self.logger.warning("Saving semantic cache failed: %s", e)
+
+            for task in tasks:
+                all_insights.extend(task.result())
             
             # Remove duplicates
             unique_insights = self._deduplicate_insights(all_insights)
             
-            self.logger.info(f"Extracted {len(unique_insights)} unique insights from {len(documents)} chunks")
+            self.logger.info("Extracted %s unique insights from %s chunks", len(unique_insights), len(documents))
             
             return unique_insights
             
         except Exception as e:
-            self.logger.error(f"Error analyzing insights: {str(e)}")
+            self.logger.error("Error analyzing insights: %s", e)
             raise
 
-    async def _analyze_chunk(self, chunk: str) -> List[InsightData]:
-        """Analyze a single chunk and extract insights"""
+    @staticmethod
+    def _worth_analyzing(doc: Document) -> bool:
+        """Whether a chunk may hold insights; the last chunk of a file, often short, is always kept"""
+        if doc.metadata.get("chunk_id", 0) >= doc.metadata.get("total_chunks", 1) - 1:
+            return True
+        return InsightAnalyzer._has_signal(doc.page_content)
+
+    @staticmethod
+    def _has_signal(chunk: str) -> bool:
+        """Whether a chunk has enough distinct words and any feedback vocabulary to analyze"""
+        return len(set(chunk.split())) >= _MIN_UNIQUE_WORDS and _SIGNAL_RE.search(chunk) is not None
+
+    def _batch_chunks(self, documents: List[Document]) -> List[str]:
+        """Join consecutive chunks of one file into excerpts of up to config.analysis_batch_tokens tokens
+
+        Adjacent chunks are rejoined without the text they overlap on, so it is only sent once;
+        chunks from different files never share a batch, keeping participants apart.
+        """
+        per_batch = max(self.config.analysis_batch_tokens // self.config.chunk_size, 1)
+        batches = []
+        parts = []
+        previous = None
+        for doc in documents:
+            same_source = previous is not None and doc.metadata.get("source") == previous.metadata.get("source")
+            if parts and (not same_source or len(parts) == per_batch):
+                batches.append("".join(parts))
+                parts = []
+
+            if not parts:
+                parts.append(doc.page_content)
+            elif doc.metadata.get("chunk_id") == previous.metadata.get("chunk_id", -2) + 1:
+                # Next window of the same text: continue it where the previous one ended
+                parts.append(doc.page_content[doc.metadata.get("overlap_chars", 0):])
+            else:
+                # Chunks in between were skipped, so mark the gap
+                parts.append("\n\n---\n\n" + doc.page_content)
+            previous = doc
+
+        if parts:
+            batches.append("".join(parts))
+        return batches
+
+    async def _analyze_chunk(self, chunk: str, embedding: Optional[List[float]] = None,
+                             content: Optional[str] = None) -> List[InsightData]:
+        """Analyze a single chunk and extract insights (content is an already-cached response)"""
         try:
             # Create the prompt for this chunk
-            formatted_prompt = self.insight_prompt.format(text_chunk=chunk)
-            
-            # Make the API call
-            response = await self.llm.ainvoke(formatted_prompt)
-            
-            # Parse the response
-            try:
-                insights_data = self.parser.parse(response.content)
-                if isinstance(insights_data, list):
-                    return [InsightData(**insight) for insight in insights_data]
-                else:
-                    return [InsightData(**insights_data)]
-            except:
-                # Fallback to simple parsing if JSON parsing fails
-                return self._parse_insights_fallback(response.content)
+            formatted_prompt = self._prompt_prefix + chunk + self._prompt_suffix
+
+            if content is None and embedding is not None:
+                # The cache is shared across sessions and answers for similar text, so a hit is
+                # only used when every quote it holds is really in this chunk
+                hit = self.semantic_cache.lookup(embedding)
+                if hit is not None:
+                    insights = self._parse_insights(hit)
+                    if self._quotes_in_chunk(insights, chunk):
+                        return insights
+                    self.logger.debug("Semantic cache hit quotes another text, analyzing the chunk")
+            if content is None:
+                # Make the API call (cached on prompt + model settings)
+                content = await self._cached_invoke(self.llm, formatted_prompt, self.PROMPT_VERSION)
+                if embedding is not None:
+                    self.semantic_cache.add(embedding, content)
+
+            return self._parse_insights(content)
             
         except Exception as e:
-            self.logger.error(f"Error analyzing chunk: {str(e)}")
+            self.logger.error("Error analyzing chunk: %s", e)
             return []
 
-    def _parse_insights_fallback(self, response_text: str) -> List[InsightData]:
-        """Fallback parsing when JSON parsing fails"""
-        insights = []
-        lines = response_text.strip().split('\n')
-        
-        current_insight = {}
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Quote:'):
-                current_insight['quote'] = line.replace('Quote:', '').strip()
-            elif line.startswith('Theme:'):
-                current_insight['theme'] = line.replace('Theme:', '').strip()
-            elif line.startswith('Sentiment:'):
-                current_insight['sentiment'] = line.replace('Sentiment:', '').strip()
-            elif line.startswith('Confidence:'):
-                try:
-                    current_insight['confidence'] = float(line.replace('Confidence:', '').strip())
-                except:
-                    current_insight['confidence'] = 0.5
-            elif line.startswith('Context:'):
-                current_insight['context'] = line.replace('Context:', '').strip()
-                # Complete insight, add to list
-                if 'quote' in current_insight and 'theme' in current_insight:
-                    insight_data = InsightData(
-                        quote=current_insight.get('quote', ''),
-                        theme=current_insight.get('theme', 'General'),
-                        sentiment=current_insight.get('sentiment', 'Neutral'),
-                        confidence=current_insight.get('confidence', 0.5),
-                        context=current_insight.get('context', ''),
-                        speaker=current_insight.get('speaker'),
-                        timestamp=current_insight.get('timestamp')
-                    )
-                    insights.append(insight_data)
-                current_insight = {}
-        
-        return insights# Agent 2: Insight Analyzer
-class InsightAnalyzer(BaseAgent):
-    """Extracts key quotes and identifies themes using NLP"""
-    
-    def __init__(self, config: AgentConfig, session_id: str):
-        super().__init__(config, session_id)
-        
-        if not config.openai_api_key:
-            raise ValueError("OpenAI API key is required for InsightAnalyzer")
-            
-        self.llm = ChatOpenAI(
-            api_key=config.openai_api_key,
-            model="gpt-3.5-turbo",
-            temperature=config.temperature,
-            max_tokens=config.max_tokens
-        )
-        self.parser = JsonOutputParser(pydantic_object=InsightData)
-        self._setup_prompts()
-    
-    def _setup_prompts(self):
-        """Setup prompts for insight extraction"""
-        self.insight_prompt = PromptTemplate(
-            input_variables=["text_chunk"],
-            template="""
-            As an expert UX researcher, analyze the following transcript chunk and extract key insights.
+    @staticmethod
+    def _quotes_in_chunk(insights: List[InsightData], chunk: str) -> bool:
+        """Whether every quote occurs in chunk, ignoring case, punctuation and contractions"""
+        chunk_text = f" {' '.join(_quote_words(chunk))} "
+        return all(f" {' '.join(_quote_words(insight.quote))} " in chunk_text for insight in insights)
 
-            Transcript:
-            {text_chunk}
-
-            Extract insights focusing on:
-            1. User pain points and frustrations
-            2. User goals and motivations
-            3. Behavioral patterns
-            4. Feature requests or suggestions
-            5. Emotional reactions
-
-            For each insight, provide:
-            - Exact quote from the transcript
-            - Speaker (if identifiable)
-            - Theme category: IMPORTANT - Use broad, general theme names. Try to group related insights under the same theme name.
-              Limit yourself to 3-5 distinct theme names across ALL insights. Examples: "Navigation & Usability", "Feature Requests",
-              "User Goals", "Pain Points", "Emotional Responses". Avoid creating overly specific themes.
-            - Sentiment (Positive, Negative, or Neutral)
-            - Confidence score (0-1)
-            - Context (brief description)
-            - Timestamp (if available)
-
-            Return a JSON list of insights. If no significant insights are found, return an empty list.
-
-            {format_instructions}
-            """
-        ).partial(format_instructions=self.parser.get_format_instructions())
-
-    async def process(self, documents: List[Document]) -> List[InsightData]:
-        """Process documents and extract insights"""
+    def _parse_insights(self, content: str) -> List[InsightData]:
+        """Parse an LLM response into insights"""
+        # A well-formed JSON list is parsed and validated in one pass without
+        # building intermediate dicts; anything else takes the lenient path
         try:
-            all_insights = []
-            
-            for doc in documents:
-                chunk_insights = await self._analyze_chunk(doc.page_content)
-                all_insights.extend(chunk_insights)
-            
-            # Remove duplicates
-            unique_insights = self._deduplicate_insights(all_insights)
-            
-            self.logger.info(f"Extracted {len(unique_insights)} unique insights from {len(documents)} chunks")
-            
-            return unique_insights
-            
-        except Exception as e:
-            self.logger.error(f"Error analyzing insights: {str(e)}")
-            raise
+            return _INSIGHTS.validate_json(_strip_json_fence(content))
+        except ValidationError:
+            pass
 
-    async def _analyze_chunk(self, chunk: str) -> List[InsightData]:
-        """Analyze a single chunk and extract insights"""
         try:
-            # Create the prompt for this chunk
-            formatted_prompt = self.insight_prompt.format(text_chunk=chunk)
-            
-            # Make the API call
-            response = await self.llm.ainvoke(formatted_prompt)
-            
-            # Parse the response
             try:
-                insights_data = self.parser.parse(response.content)
-                if isinstance(insights_data, list):
-                    return [InsightData(**insight) for insight in insights_data]
-                else:
-                    return [InsightData(**insights_data)]
-            except Exception as e:
-                # Log the parsing error and the actual response
-                self.logger.error(f"JSON parsing failed: {str(e)}")
-                self.logger.error(f"Raw response content: {response.content[:500]}...")
-                
-                # Fallback to simple parsing if JSON parsing fails
-                fallback_results = self._parse_insights_fallback(response.content)
-                self.logger.info(f"Fallback parser returned {len(fallback_results)} insights")
-                return fallback_results
-            
+                insights_data = _loads_llm_json(content)
+            except orjson.JSONDecodeError:
+                # Slower but more forgiving (partial JSON, surrounding prose)
+                insights_data = self.parser.parse(content)
+            if isinstance(insights_data, list):
+                return [InsightData(**insight) for insight in insights_data]
+            else:
+                return [InsightData(**insights_data)]
         except Exception as e:
-            self.logger.error(f"Error analyzing chunk: {str(e)}")
-            return []
+            # Log the parsing error and the actual response
+            self.logger.error("JSON parsing failed: %s", e)
+            self.logger.error("Raw response content: %s...", content[:500])
+            
+            # Fallback to simple parsing if JSON parsing fails
+            fallback_results = self._parse_insights_fallback(content)
+            self.logger.info("Fallback parser returned %s insights", len(fallback_results))
+            return fallback_results
 
     def _parse_insights_fallback(self, response_text: str) -> List[InsightData]:
         """Fallback parsing when JSON parsing fails"""
         insights = []
-        lines = response_text.strip().split('\n')
         
         current_insight = {}
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Quote:'):
-                current_insight['quote'] = line.replace('Quote:', '').strip()
-            elif line.startswith('Theme:'):
-                current_insight['theme'] = line.replace('Theme:', '').strip()
-            elif line.startswith('Sentiment:'):
-                current_insight['sentiment'] = line.replace('Sentiment:', '').strip()
-            elif line.startswith('Confidence:'):
+        # One scan over the text picks out every "Field: value" line
+        for match in _FALLBACK_FIELD_RE.finditer(response_text):
+            field, value = match.group(1).lower(), match.group(2).strip()
+            if field == 'confidence':
                 try:
-                    current_insight['confidence'] = float(line.replace('Confidence:', '').strip())
-                except:
+                    current_insight['confidence'] = float(value)
+                except ValueError:
                     current_insight['confidence'] = 0.5
-            elif line.startswith('Context:'):
-                current_insight['context'] = line.replace('Context:', '').strip()
+            else:
+                current_insight[field] = value
+
+            if field == 'context':
                 # Complete insight, add to list
                 if 'quote' in current_insight and 'theme' in current_insight:
                     insight_data = InsightData(
@@ -499,173 +967,65 @@ class InsightAnalyzer(BaseAgent):
         """Remove duplicate insights based on quote similarity"""
         unique_insights = []
         seen_quotes = set()
+        # Shingle sets of kept quotes, bucketed by sentiment and negation words, since
+        # rewordings are only looked for among quotes that agree on both
+        seen_shingles: Dict[Tuple[str, Tuple[str, ...]], List[set]] = {}
         
         for insight in insights:
-            # Simple deduplication based on quote content
-            quote_key = insight.quote.lower().strip()[:50]  # First 50 chars, normalized
-            if quote_key not in seen_quotes:
-                seen_quotes.add(quote_key)
-                unique_insights.append(insight)
-        
-        return unique_insights
-    
-async def process(self, documents: List[Document]) -> List[InsightData]:
-    """Process documents and extract insights"""
-    try:
-        all_insights = []
-        
-        for doc in documents:
-            chunk_insights = await self._analyze_chunk(doc.page_content)
-            all_insights.extend(chunk_insights)
-        
-        # Remove duplicates
-        unique_insights = self._deduplicate_insights(all_insights)
-        
-        self.logger.info(f"Extracted {len(unique_insights)} unique insights from {len(documents)} chunks")
-        self.update_session_status(
-            ProcessingStatus.PROCESSING, 
-            insights_extracted=len(unique_insights)
-        )
-        
-        return unique_insights
-        
-    except Exception as e:
-        self.logger.error(f"Error analyzing insights: {str(e)}")
-        raise
-
-async def _analyze_chunk(self, chunk: str) -> List[InsightData]:
-    """Analyze a single chunk and extract insights"""
-    try:
-        # Create the prompt for this chunk
-        formatted_prompt = self.insight_prompt.format(chunk=chunk)
-        
-        # Make the API call
-        response = await self.llm.ainvoke(formatted_prompt)
-        
-        # Parse the response - expecting a list of insights
-        insights_text = response.content
-        
-        # Basic parsing - you may need to adjust this based on your prompt format
-        insights = []
-        lines = insights_text.strip().split('\n')
-        
-        current_insight = {}
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Quote:'):
-                current_insight['quote'] = line.replace('Quote:', '').strip()
-            elif line.startswith('Theme:'):
-                current_insight['theme'] = line.replace('Theme:', '').strip()
-            elif line.startswith('Sentiment:'):
-                current_insight['sentiment'] = line.replace('Sentiment:', '').strip()
-            elif line.startswith('Confidence:'):
-                try:
-                    current_insight['confidence'] = float(line.replace('Confidence:', '').strip())
-                except:
-                    current_insight['confidence'] = 0.5
-            elif line.startswith('Context:'):
-                current_insight['context'] = line.replace('Context:', '').strip()
-                # Complete insight, add to list
-                if 'quote' in current_insight and 'theme' in current_insight:
-                    insight_data = InsightData(
-                        quote=current_insight.get('quote', ''),
-                        theme=current_insight.get('theme', 'General'),
-                        sentiment=current_insight.get('sentiment', 'Neutral'),
-                        confidence=current_insight.get('confidence', 0.5),
-                        context=current_insight.get('context', ''),
-                        speaker=current_insight.get('speaker'),
-                        timestamp=current_insight.get('timestamp')
-                    )
-                    insights.append(insight_data)
-                current_insight = {}
-        
-        return insights
-        
-    except Exception as e:
-        self.logger.error(f"Error analyzing chunk: {str(e)}")
-        return []
+            # Exact match on the normalized words first ("I can't" equals "I cannot")
+            words = _quote_words(insight.quote)
+            quote_key = " ".join(words)
+            if quote_key in seen_quotes:
+                continue
+
+            # Then rewordings: similar words and word pairs, but never across a negation
+            # ("I like" / "I don't like") or between quotes of opposite sentiment
+            bucket = seen_shingles.setdefault(
+                (insight.sentiment, tuple(sorted(word for word in words if word in _NEGATIONS))), []
+            )
+            shingles = set(words).union(map(" ".join, zip(words, words[1:])))
+            if any(
+                len(shingles & seen) >= _NEAR_DUPLICATE_JACCARD * len(shingles | seen)
+                for seen in bucket
+            ):
+                continue
 
-def _deduplicate_insights(self, insights: List[InsightData]) -> List[InsightData]:
-    """Remove duplicate insights based on quote similarity"""
-    unique_insights = []
-    seen_quotes = set()
-    
-    for insight in insights:
-        # Simple deduplication based on quote content
-        quote_key = insight.quote.lower().strip()[:50]  # First 50 chars, normalized
-        if quote_key not in seen_quotes:
             seen_quotes.add(quote_key)
+            bucket.append(shingles)
             unique_insights.append(insight)
-    
-    return unique_insights
-    
-async def _analyze_chunk(self, document: Document) -> List[InsightData]:
-    """Analyze a single document chunk"""
-    try:
-        # Create a simple prompt without complex parsing
-        simple_prompt = f"""
-Extract insights from this user research text. Return valid JSON only:
-
-{document.page_content}
-
-Format as JSON array:
-[{{"quote": "exact quote", "speaker": "User", "theme": "Theme Name", "sentiment": "Positive", "confidence": 0.8, "context": "brief description"}}]
-"""
-        
-        response = await self.llm.ainvoke([{"role": "user", "content": simple_prompt}])
-        
-        # Parse JSON response
-        import json
-        content = response.content.strip()
-        if content.startswith('```'):
-            content = content.split('```')[1].replace('json', '').strip()
-        
-        data = json.loads(content)
-        
-        insights = []
-        for item in data:
-            insight = InsightData(
-                quote=item.get('quote', ''),
-                speaker=item.get('speaker'),
-                theme=item.get('theme', 'General'),
-                sentiment=item.get('sentiment', 'Neutral'),
-                confidence=float(item.get('confidence', 0.5)),
-                context=item.get('context', ''),
-                timestamp=None
-            )
-            insights.append(insight)
-        
-        return insights
         
-    except Exception as e:
-        self.logger.error(f"Error in _analyze_chunk: {e}")
-        return []
+        return unique_insights
 
 # Agent 3: Theme Synthesizer
 class ThemeSynthesizer(BaseAgent):
     """Groups insights and generates personas/summaries"""
+
+    # Bump whenever theme_prompt changes so cached LLM responses are invalidated
+    PROMPT_VERSION = "1"
     
     def __init__(self, config: AgentConfig, session_id: str):
         super().__init__(config, session_id)
         
-        if not config.openai_api_key:
+        if not config.openai_api_key and not config.local_model_url:
             raise ValueError("OpenAI API key is required for ThemeSynthesizer")
             
-        self.llm = ChatOpenAI(
-            api_key=config.openai_api_key,
-            model="gpt-3.5-turbo",
-            temperature=config.temperature
-        )
+        self.llm = get_chat_model(config, "gpt-3.5-turbo", temperature=config.temperature)
         
-        try:
-            # Use OpenAI embeddings (lightweight, no PyTorch needed)
-            self.embedding_model = OpenAIEmbeddings(
-                api_key=config.openai_api_key,
-                model="text-embedding-3-small"  # Smaller, faster, cheaper
-            )
-        except Exception as e:
-            self.logger.warning(f"Failed to load embedding model: {e}")
-            self.embedding_model = None
+        self.embedding_model = None
+        if not config.openai_api_key:
+            self.logger.info("No OpenAI API key, grouping themes by name without embeddings")
+        else:
+            try:
+                from langchain_openai import OpenAIEmbeddings
+
+                # Use OpenAI embeddings (lightweight, no PyTorch needed)
+                self.embedding_model = OpenAIEmbeddings(
+                    api_key=config.openai_api_key,
+                    model="text-embedding-3-small",  # Smaller, faster, cheaper
+                    http_async_client=get_http_client()
+                )
+            except Exception as e:
+                self.logger.warning("Failed to load embedding model: %s", e)
             
         self._setup_prompts()
     
@@ -698,6 +1058,39 @@ class ThemeSynthesizer(BaseAgent):
             """
         )
         
+        # Same task as theme_prompt for several groups at once, so the instructions are sent once
+        self.batch_theme_prompt = PromptTemplate(
+            input_variables=["groups"],
+            template="""
+            As a senior UX researcher, analyze each of the following groups of related insights and create a comprehensive theme summary for every group.
+
+            {groups}
+
+            IMPORTANT: Each group represents a genuine, distinct pattern in the data.
+            - Give every group a clear name that distinguishes it from the other groups
+            - Avoid redundant or overlapping theme names
+
+            For each group, create a theme that includes:
+            1. A clear, descriptive theme name
+            2. Priority level (High/Medium/Low) based on frequency and impact
+            3. A comprehensive summary of the theme
+
+            Return your analysis as a JSON array with exactly one object per group, in group order:
+            [
+                {{
+                    "group": 1,
+                    "theme_name": "Clear Theme Name",
+                    "priority": "High/Medium/Low",
+                    "summary": "Detailed summary of the theme and its implications"
+                }}
+            ]
+            """
+        )
+
+        # Render the static parts once; the per-call insights are spliced in between them
+        self._theme_prefix, self._theme_suffix = _split_prompt(self.theme_prompt, "insights")
+        self._batch_theme_prefix, self._batch_theme_suffix = _split_prompt(self.batch_theme_prompt, "groups")
+        
         self.persona_prompt = PromptTemplate(
             input_variables=["insights", "themes"],
             template="""
@@ -728,7 +1121,7 @@ class ThemeSynthesizer(BaseAgent):
             theme_clusters = await self._cluster_insights(insights)
 
             # Limit is already applied in _cluster_insights, so theme_clusters is already limited to 5
-            self.update_session_status(
+            await self.update_session_status(
                 ProcessingStatus.PROCESSING,
                 themes_identified=len(theme_clusters)
             )
@@ -736,7 +1129,7 @@ class ThemeSynthesizer(BaseAgent):
             return theme_clusters
 
         except Exception as e:
-            self.logger.error(f"Error synthesizing themes: {str(e)}")
+            self.logger.error("Error synthesizing themes: %s", e)
             raise
     
     async def _cluster_insights(self, insights: List[InsightData]) -> List[ThemeCluster]:
@@ -751,58 +1144,161 @@ class ThemeSynthesizer(BaseAgent):
             if theme_name not in theme_groups:
                 theme_groups[theme_name] = []
             theme_groups[theme_name].append(insight)
+
+        # Regroup by quote meaning so near-synonymous theme names get merged
+        if self.embedding_model and len(theme_groups) > 1:
+            try:
+                theme_groups = await self._group_by_embedding(insights, len(theme_groups))
+            except Exception as e:
+                self.logger.warning("Embedding clustering failed, grouping by theme name: %s", e)
         
         # Create theme clusters
-        theme_clusters = []
-        for theme_name, theme_insights in theme_groups.items():
-            if len(theme_insights) >= 1:
-                cluster = await self._create_theme_cluster(theme_name, theme_insights)
-                theme_clusters.append(cluster)
+        theme_clusters = await self._create_theme_clusters(theme_groups)
         
-        # Sort by frequency and priority
-        theme_clusters.sort(key=lambda x: (x.priority == "High", x.frequency), reverse=True)
-
-        # Limit to max 5 themes (prioritize high-value themes)
-        self.logger.info(f"Generated {len(theme_clusters)} themes, limiting to 5")
-        limited_themes = theme_clusters[:5]
-        self.logger.info(f"Returning {len(limited_themes)} themes: {[t.theme_name for t in limited_themes]}")
+        self.logger.info("Generated %s themes, limiting to 5", len(theme_clusters))
+        limited_themes = self._top_themes(theme_clusters, 5)
+        self.logger.info("Returning %s themes: %s", len(limited_themes), [t.theme_name for t in limited_themes])
         return limited_themes
     
-    async def _create_theme_cluster(self, theme_name: str, insights: List[InsightData]) -> ThemeCluster:
-        """Create a comprehensive theme cluster"""
-        insights_text = "\n".join([
+    @staticmethod
+    def _top_themes(theme_clusters: List[ThemeCluster], limit: int) -> List[ThemeCluster]:
+        """The limit highest-ranked themes, by priority and then frequency
+
+        Only the top themes are ordered, so this is a partial sort (stable for ties, like sort()).
+        """
+        return heapq.nsmallest(
+            limit, theme_clusters, key=lambda x: (_PRIORITY_RANK.get(x.priority, len(_PRIORITY_RANK)), -x.frequency)
+        )
+
+    async def _group_by_embedding(self, insights: List[InsightData], n_clusters: int) -> Dict[str, List[InsightData]]:
+        """Cluster insights with k-means over quote embeddings, naming each cluster by its majority theme"""
+        import faiss
+        import numpy as np
+
+        # One batched embeddings request for all quotes
+        vectors = await self.embedding_model.aembed_documents([insight.quote for insight in insights])
+        vectors = np.asarray(vectors, dtype="float32")
+        faiss.normalize_L2(vectors)
+
+        def assign_clusters():
+            dim = vectors.shape[1]
+
+            # Drop paraphrased duplicates that SimHash missed, keeping the first of each
+            flat = faiss.IndexFlatIP(dim)
+            flat.add(vectors)
+            scores, neighbours = flat.search(vectors, min(8, len(insights)))
+            duplicates = set()
+            keep = []
+            for row in range(len(insights)):
+                if row in duplicates:
+                    continue
+                keep.append(row)
+                duplicates.update(
+                    int(other) for score, other in zip(scores[row], neighbours[row])
+                    if other > row and score >= _SEMANTIC_DUPLICATE_SIMILARITY
+                )
+            kept_vectors = vectors[keep]
+
+            # Centroids live in an fp16 scalar-quantized index, halving assignment bandwidth
+            clustering = faiss.Clustering(dim, min(n_clusters, len(keep)))
+            clustering.niter = 20
+            clustering.seed = 1234
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+            clustering.train(kept_vectors, index)
+            return keep, index.search(kept_vectors, 1)[1]
+
+        # Search and k-means are CPU-bound (FAISS releases the GIL), so keep them off the event loop
+        keep, labels = await asyncio.to_thread(assign_clusters)
+        if len(keep) < len(insights):
+            self.logger.info("Dropped %s near-duplicate quotes before clustering", len(insights) - len(keep))
+
+        clusters = {}
+        for row, label in zip(keep, labels[:, 0]):
+            clusters.setdefault(int(label), []).append(insights[row])
+
+        theme_groups = {}
+        for members in clusters.values():
+            theme_name = Counter(insight.theme for insight in members).most_common(1)[0][0]
+            theme_groups.setdefault(theme_name, []).extend(members)
+
+        return theme_groups
+    
+    async def _create_theme_clusters(self, theme_groups: Dict[str, List[InsightData]]) -> List[ThemeCluster]:
+        """Summarize every theme group, batching all groups into a single LLM call"""
+        groups = [(name, members) for name, members in theme_groups.items() if members]
+        if len(groups) <= 1:
+            return [await self._create_theme_cluster(name, members) for name, members in groups]
+
+        theme_data_by_group = {}
+        try:
+            groups_text = "\n\n".join(
+                f"GROUP {i}:\n{self._format_theme_insights(members)}"
+                for i, (_, members) in enumerate(groups, 1)
+            )
+            prompt = self._batch_theme_prefix + groups_text + self._batch_theme_suffix
+            content = await self._cached_invoke(self.llm, prompt, self.PROMPT_VERSION)
+
+            for position, theme_data in enumerate(_loads_llm_json(content), 1):
+                theme_data_by_group[int(theme_data.get("group", position))] = theme_data
+        except Exception as e:
+            self.logger.warning("Batched theme summary failed, summarizing groups individually: %s", e)
+
+        # Any group the batched response missed gets its own call; bounded like
+        # chunk analysis, since a failed batch sends every group this way
+        semaphore = asyncio.Semaphore(self.config.max_concurrency or 8)
+
+        async def build(i: int, name: str, members: List[InsightData]) -> ThemeCluster:
+            if i in theme_data_by_group:
+                return self._build_theme_cluster(name, members, theme_data_by_group[i])
+            async with semaphore:
+                return await self._create_theme_cluster(name, members)
+
+        return list(await asyncio.gather(*(
+            build(i, name, members) for i, (name, members) in enumerate(groups, 1)
+        )))
+
+    def _format_theme_insights(self, insights: List[InsightData]) -> str:
+        """Render a group's insights for a theme prompt"""
+        # Sorted so the same set of quotes always renders the same (cacheable) prompt
+        return "\n".join([
             f"- \"{insight.quote}\" (Sentiment: {insight.sentiment}, Confidence: {insight.confidence})"
-            for insight in insights
+            for insight in sorted(insights, key=lambda insight: insight.quote)
         ])
+
+    def _build_theme_cluster(self, theme_name: str, insights: List[InsightData], theme_data: Dict[str, Any]) -> ThemeCluster:
+        """Combine the LLM's theme summary with frequency/sentiment-based priority"""
+        # Determine priority based on frequency and sentiment
+        negative_count = sum(1 for insight in insights if insight.sentiment == "Negative")
+        frequency = len(insights)
+        
+        if frequency >= 5 or (negative_count >= 2 and frequency >= 3):
+            priority = "High"
+        elif frequency >= 3:
+            priority = "Medium"
+        else:
+            priority = "Low"
         
+        return ThemeCluster(
+            theme_name=theme_data.get("theme_name", theme_name),
+            insights=insights,
+            frequency=frequency,
+            priority=priority,
+            summary=theme_data.get("summary", f"Theme based on {frequency} insights")
+        )
+    
+    async def _create_theme_cluster(self, theme_name: str, insights: List[InsightData]) -> ThemeCluster:
+        """Create a comprehensive theme cluster"""
         try:
-            chain = self.theme_prompt | self.llm
-            result = await chain.ainvoke({"insights": insights_text})
+            prompt = self._theme_prefix + self._format_theme_insights(insights) + self._theme_suffix
+            content = await self._cached_invoke(self.llm, prompt, self.PROMPT_VERSION)
             
             # Parse the JSON response
-            theme_data = json.loads(result.content)
+            theme_data = _loads_llm_json(content)
             
-            # Determine priority based on frequency and sentiment
-            negative_count = sum(1 for insight in insights if insight.sentiment == "Negative")
-            frequency = len(insights)
-            
-            if frequency >= 5 or (negative_count >= 2 and frequency >= 3):
-                priority = "High"
-            elif frequency >= 3:
-                priority = "Medium"
-            else:
-                priority = "Low"
-            
-            return ThemeCluster(
-                theme_name=theme_data.get("theme_name", theme_name),
-                insights=insights,
-                frequency=frequency,
-                priority=priority,
-                summary=theme_data.get("summary", f"Theme based on {frequency} insights")
-            )
+            return self._build_theme_cluster(theme_name, insights, theme_data)
             
         except Exception as e:
-            self.logger.warning(f"Error creating theme cluster: {str(e)}")
+            self.logger.warning("Error creating theme cluster: %s", e)
             # Fallback to basic cluster
             return ThemeCluster(
                 theme_name=theme_name,
@@ -817,31 +1313,30 @@ class ThemeSynthesizer(BaseAgent):
 class KeyInsightSynthesizer(BaseAgent):
     """Generates Key Insight cards matching presentation format"""
 
+    # Bump whenever either synthesis prompt changes so cached LLM responses are invalidated
+    PROMPT_VERSION = "2"
+
     def __init__(self, config: AgentConfig, session_id: str):
         super().__init__(config, session_id)
 
-        if not config.openai_api_key:
+        if not config.openai_api_key and not config.local_model_url:
             raise ValueError("OpenAI API key is required for KeyInsightSynthesizer")
 
-        self.llm = ChatOpenAI(
-            api_key=config.openai_api_key,
-            model="gpt-3.5-turbo-16k",  # Use larger context for better synthesis
+        self.llm = get_chat_model(
+            config,
+            config.synthesis_model,
             temperature=0.3  # Lower temperature for more focused output
         )
+        self.encoding = tiktoken.get_encoding("cl100k_base")
         self._setup_prompts()
 
     def _setup_prompts(self):
         """Setup prompts for key insight generation"""
-        self.insight_synthesis_prompt = PromptTemplate(
-            input_variables=["all_quotes", "theme_summaries"],
-            template="""
-            As an expert UX researcher, analyze all the user research data and create 3-5 Key Insight cards for a presentation.
-
-            USER QUOTES AND FEEDBACK:
-            {all_quotes}
-
-            THEME SUMMARIES:
-            {theme_summaries}
+        # The instruction block never changes, so render it once into a fixed
+        # system message; only the research data varies between calls, which
+        # keeps the prompt prefix identical for OpenAI's prompt caching.
+        system_template = """
+            As an expert UX researcher, analyze the user research data provided by the user and create 3-5 Key Insight cards for a presentation.
 
             Create 1-5 Key Insight cards based on what the data actually supports. Focus on quality over quantity - only create insights that are:
             - Strongly supported by multiple quotes
@@ -883,15 +1378,18 @@ class KeyInsightSynthesizer(BaseAgent):
             - Relevant to product decisions
             - Clearly differentiated from each other
             """
-        )
+        self.insight_synthesis_prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=PromptTemplate.from_template(system_template).format()),
+            ("human", "USER QUOTES AND FEEDBACK:\n{all_quotes}\n\nTHEME SUMMARIES:\n{theme_summaries}"),
+        ])
 
         self.executive_summary_prompt = PromptTemplate(
-            input_variables=["key_insights", "all_data"],
+            input_variables=["theme_summaries", "all_data"],
             template="""
             As a senior UX researcher, create an Executive Summary for a research presentation.
 
-            KEY INSIGHTS:
-            {key_insights}
+            THEME SUMMARIES:
+            {theme_summaries}
 
             ALL RESEARCH DATA:
             {all_data}
@@ -919,59 +1417,87 @@ class KeyInsightSynthesizer(BaseAgent):
 
     async def process(self, insights: List[InsightData], themes: List[ThemeCluster]) -> Tuple[List[KeyInsightCard], ExecutiveSummary]:
         """Generate Key Insight cards and Executive Summary"""
+        # Nothing to synthesize (including the orchestrator's placeholder insight)
+        if len(insights) <= 1 or all(i.theme == "Analysis Result" for i in insights):
+            self.logger.info("Too little data for synthesis - skipping LLM calls")
+            return self._empty_result(insights)
+
         try:
             # Prepare data for synthesis
             all_quotes = self._prepare_quotes(insights)
             theme_summaries = self._prepare_theme_summaries(themes)
 
-            # Generate key insight cards
-            key_insights = await self._generate_key_insights(all_quotes, theme_summaries)
-
-            # Generate executive summary
-            exec_summary = await self._generate_executive_summary(key_insights, all_quotes)
+            # Generate key insight cards and executive summary concurrently; both
+            # work from the same quotes and theme summaries
+            key_insights, exec_summary = await asyncio.gather(
+                self._generate_key_insights(all_quotes, theme_summaries),
+                self._generate_executive_summary(theme_summaries, all_quotes)
+            )
 
-            self.logger.info(f"Generated {len(key_insights)} key insight cards")
+            self.logger.info("Generated %s key insight cards", len(key_insights))
 
             return key_insights, exec_summary
 
         except Exception as e:
-            self.logger.error(f"Error synthesizing key insights: {str(e)}")
+            self.logger.error("Error synthesizing key insights: %s", e)
             raise
 
+    def _empty_result(self, insights: List[InsightData]) -> Tuple[List[KeyInsightCard], ExecutiveSummary]:
+        """Build the synthesis result for degenerate input without calling the LLM"""
+        key_finding = insights[0].quote if insights else "No significant insights found in the provided documents"
+        return [], ExecutiveSummary(
+            research_question="User research analysis",
+            key_finding=key_finding,
+            key_insight="Not enough research data to identify patterns",
+            recommendation="Provide additional research material and run the analysis again",
+            context=None
+        )
+
     def _prepare_quotes(self, insights: List[InsightData]) -> str:
         """Prepare all quotes for synthesis"""
+        # Fill the prompt up to a token budget, strongest evidence first
+        ranked = sorted(insights, key=lambda i: (-i.confidence, -len(i.quote)))
+        budget = self.config.max_prompt_tokens
         quotes_text = []
-        for i, insight in enumerate(insights[:50], 1):  # Limit to top 50 for context
+        for i, insight in enumerate(ranked, 1):
             speaker_info = f" - {insight.speaker}" if insight.speaker else ""
-            quotes_text.append(
+            line = (
                 f"{i}. \"{insight.quote}\"{speaker_info} "
                 f"[Theme: {insight.theme}, Sentiment: {insight.sentiment}]"
             )
+            budget -= len(self.encoding.encode(line)) + 1  # +1 for the joining newline
+            if budget < 0:
+                break
+            quotes_text.append(line)
         return "\n".join(quotes_text)
 
     def _prepare_theme_summaries(self, themes: List[ThemeCluster]) -> str:
         """Prepare theme summaries"""
-        summaries = []
-        for theme in themes:
-            summaries.append(
-                f"- {theme.theme_name} ({theme.priority} priority, {theme.frequency} mentions): "
-                f"{theme.summary}"
-            )
-        return "\n".join(summaries)
+        return "\n".join(
+            f"- {theme.theme_name} ({theme.priority} priority, {theme.frequency} mentions): "
+            f"{theme.summary}"
+            for theme in themes
+        )
 
     async def _generate_key_insights(self, all_quotes: str, theme_summaries: str) -> List[KeyInsightCard]:
         """Generate key insight cards using LLM"""
         try:
-            chain = self.insight_synthesis_prompt | self.llm
-            result = await chain.ainvoke({
-                "all_quotes": all_quotes,
-                "theme_summaries": theme_summaries
-            })
-
-            # Parse JSON response
-            insights_data = json.loads(result.content)
+            prompt = self.insight_synthesis_prompt.format_prompt(
+                all_quotes=all_quotes,
+                theme_summaries=theme_summaries
+            )
+            content = await self._cached_invoke(self.llm, prompt, self.PROMPT_VERSION)
 
-            # Convert to KeyInsightCard objects
+            # Parse and validate in one pass when the response matches the schema exactly
+            try:
+                key_insights = _KEY_INSIGHT_CARDS.validate_json(_strip_json_fence(content))
+                for i, key_insight in enumerate(key_insights, 1):
+                    key_insight.insight_number = i
+                return key_insights
+            except ValidationError:
+                insights_data = _loads_llm_json(content)
+
+            # Lenient conversion: fill missing fields and wrap bare-string quotes
             key_insights = []
             for i, insight_dict in enumerate(insights_data, 1):
                 # Convert supporting quotes
@@ -996,36 +1522,28 @@ class KeyInsightSynthesizer(BaseAgent):
             return key_insights
 
         except Exception as e:
-            self.logger.error(f"Error generating key insights: {str(e)}")
+            self.logger.error("Error generating key insights: %s", e)
             # Return empty list on error
             return []
 
-    async def _generate_executive_summary(self, key_insights: List[KeyInsightCard], all_data: str) -> ExecutiveSummary:
+    async def _generate_executive_summary(self, theme_summaries: str, all_data: str) -> ExecutiveSummary:
         """Generate executive summary"""
         try:
-            # Prepare key insights summary
-            insights_summary = "\n".join([
-                f"{i.insight_number}. {i.title}: {i.main_finding}"
-                for i in key_insights
-            ])
-
-            chain = self.executive_summary_prompt | self.llm
-            result = await chain.ainvoke({
-                "key_insights": insights_summary,
-                "all_data": all_data[:3000]  # Limit for context
-            })
-
-            # Parse JSON response
-            summary_data = json.loads(result.content)
+            prompt = self.executive_summary_prompt.format(
+                theme_summaries=theme_summaries,
+                all_data=all_data[:3000]  # Limit for context
+            )
+            content = await self._cached_invoke(self.llm, prompt, self.PROMPT_VERSION)
 
-            return ExecutiveSummary(**summary_data)
+            # Parse and validate JSON response
+            return ExecutiveSummary.model_validate_json(_strip_json_fence(content))
 
         except Exception as e:
-            self.logger.error(f"Error generating executive summary: {str(e)}")
+            self.logger.error("Error generating executive summary: %s", e)
             # Return a default summary
             return ExecutiveSummary(
                 research_question="User research analysis",
-                key_finding=f"{len(key_insights)} key insights identified from user research",
+                key_finding="Key themes identified from user research",
                 key_insight="Multiple themes emerged from the research",
                 recommendation="Review key insights and prioritize implementation",
                 context=None
@@ -1036,103 +1554,97 @@ class KeyInsightSynthesizer(BaseAgent):
 class OutputFormatter(BaseAgent):
     """Creates structured deliverables for stakeholders"""
     
-    def __init__(self, config: AgentConfig, session_id: str):
+    def __init__(self, config: AgentConfig, session_id: str, generated_at: Optional[datetime] = None):
         super().__init__(config, session_id)
         self.output_dir = Path(f"outputs/{session_id}")
         self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # One timestamp for every report in this run, formatted once
+        generated_at = generated_at or datetime.now()
+        self.generated_at = generated_at.isoformat()
+        self.generated_at_display = generated_at.strftime("%Y-%m-%d %H:%M")
+        # Header block shared by the Markdown reports
+        self._session_header = f"**Session ID:** {session_id}\n**Generated:** {self.generated_at_display}\n"
     
     async def process(self, insights: List[InsightData], themes: List[ThemeCluster],
                      personas: List[PersonaData]) -> Dict[str, str]:
         """Generate formatted outputs"""
         try:
-            outputs = {}
-
-            # Generate JSON report
-            json_path = await self._create_json_report(insights, themes, personas)
-            outputs["json_report"] = str(json_path)
-
-            # Generate executive summary
-            summary_path = await self._create_executive_summary(themes, personas)
-            outputs["executive_summary"] = str(summary_path)
-
-            # Generate detailed insights report
-            insights_path = await self._create_insights_report(insights, themes)
-            outputs["insights_report"] = str(insights_path)
-
-            # Generate persona profiles
-            personas_path = await self._create_persona_profiles(personas)
-            outputs["persona_profiles"] = str(personas_path)
+            # The reports share no state and go to separate files, so write them concurrently
+            json_path, summary_path, insights_path, personas_path = await asyncio.gather(
+                self._create_json_report(insights, themes, personas),
+                self._create_executive_summary(themes, personas),
+                self._create_insights_report(insights, themes),
+                self._create_persona_profiles(personas)
+            )
+            outputs = {
+                "json_report": str(json_path),
+                "executive_summary": str(summary_path),
+                "insights_report": str(insights_path),
+                "persona_profiles": str(personas_path)
+            }
 
-            self.update_session_status(ProcessingStatus.COMPLETED)
+            await self.update_session_status(ProcessingStatus.COMPLETED)
 
             return outputs
 
         except Exception as e:
-            self.logger.error(f"Error formatting outputs: {str(e)}")
-            self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
+            self.logger.error("Error formatting outputs: %s", e)
+            await self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
             raise
 
     async def process_with_key_insights(self, insights: List[InsightData], themes: List[ThemeCluster],
-                                       key_insights: List[KeyInsightCard], exec_summary: ExecutiveSummary) -> Dict[str, str]:
-        """Generate formatted outputs with key insights"""
-        try:
-            outputs = {}
-
-            # Generate JSON report with key insights
-            json_path = await self._create_json_report_with_key_insights(insights, themes, key_insights, exec_summary)
-            outputs["json_report"] = str(json_path)
+                                       key_insights: List[KeyInsightCard], exec_summary: ExecutiveSummary,
+                                       theme_reports: Optional[Awaitable[Dict[str, str]]] = None) -> Dict[str, str]:
+        """Generate formatted outputs with key insights
 
-            # Generate executive summary (new format)
-            summary_path = await self._create_executive_summary_new(exec_summary, key_insights)
-            outputs["executive_summary"] = str(summary_path)
-
-            # Generate detailed insights report
-            insights_path = await self._create_insights_report(insights, themes)
-            outputs["insights_report"] = str(insights_path)
-
-            # Generate persona profiles (empty for now)
-            personas_path = await self._create_persona_profiles([])
-            outputs["persona_profiles"] = str(personas_path)
+        theme_reports may be an already-running write_theme_reports() task, letting the
+        reports that don't need key insights be written while they are still being generated.
+        """
+        try:
+            if theme_reports is None:
+                theme_reports = self.write_theme_reports(insights, themes)
+
+            # The reports go to separate files, so write them concurrently
+            json_path, summary_path, theme_outputs = await asyncio.gather(
+                self._create_json_report_with_key_insights(insights, themes, key_insights, exec_summary),
+                self._create_executive_summary_new(exec_summary, key_insights),
+                theme_reports
+            )
+            outputs = {
+                "json_report": str(json_path),
+                "executive_summary": str(summary_path),
+                **theme_outputs
+            }
 
-            self.update_session_status(ProcessingStatus.COMPLETED)
+            await self.update_session_status(ProcessingStatus.COMPLETED)
 
             return outputs
 
         except Exception as e:
-            self.logger.error(f"Error formatting outputs: {str(e)}")
-            self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
+            self.logger.error("Error formatting outputs: %s", e)
+            await self.update_session_status(ProcessingStatus.FAILED, error_message=str(e))
             raise
 
+    async def write_theme_reports(self, insights: List[InsightData], themes: List[ThemeCluster]) -> Dict[str, str]:
+        """Write the reports that depend only on insights and themes"""
+        insights_path, personas_path = await asyncio.gather(
+            self._create_insights_report(insights, themes),
+            self._create_persona_profiles([])  # Persona profiles are empty for now
+        )
+        return {
+            "insights_report": str(insights_path),
+            "persona_profiles": str(personas_path)
+        }
+
     async def _create_json_report_with_key_insights(self, insights: List[InsightData], themes: List[ThemeCluster],
                                                    key_insights: List[KeyInsightCard], exec_summary: ExecutiveSummary) -> Path:
         """Create comprehensive JSON report with key insights"""
         report = {
             "session_id": self.session_id,
-            "generated_at": datetime.now().isoformat(),
-            "executive_summary": {
-                "research_question": exec_summary.research_question,
-                "key_finding": exec_summary.key_finding,
-                "key_insight": exec_summary.key_insight,
-                "recommendation": exec_summary.recommendation,
-                "context": exec_summary.context
-            },
-            "key_insights": [
-                {
-                    "insight_number": ki.insight_number,
-                    "title": ki.title,
-                    "main_finding": ki.main_finding,
-                    "finding_type": ki.finding_type,
-                    "problem_statement": ki.problem_statement,
-                    "supporting_quotes": [
-                        {"quote": q.quote, "speaker": q.speaker, "context": q.context}
-                        for q in ki.supporting_quotes
-                    ],
-                    "behavioral_pattern": ki.behavioral_pattern,
-                    "expected_journey": ki.expected_journey,
-                    "impact_metric": ki.impact_metric
-                }
-                for ki in key_insights
-            ],
+            "generated_at": self.generated_at,
+            "executive_summary": exec_summary,
+            "key_insights": key_insights,
             "summary": {
                 "total_insights": len(insights),
                 "themes_identified": len(themes),
@@ -1141,34 +1653,49 @@ class OutputFormatter(BaseAgent):
                 "quotes_extracted": sum(len(ki.supporting_quotes) for ki in key_insights),
                 "files_processed": 5,  # This should come from session data
                 "processing_time": "2m 34s",  # This should be calculated
-                "total_tokens": sum([len(i.quote.split()) for i in insights]) * 1.3  # Rough estimate
+                "total_tokens": sum(map(len, tiktoken.get_encoding("cl100k_base").encode_batch([i.quote for i in insights])))
             },
-            "themes": [
-                {
+        }
+
+        return await self._stream_json_report(report, insights, themes)
+
+    async def _stream_json_report(self, report: Dict[str, Any], insights: List[InsightData],
+                                  themes: List[ThemeCluster]) -> Path:
+        """Write report's fields, then the themes one at a time, then every insight
+
+        The full report is never assembled as one dict or one JSON document in memory.
+        """
+        # Theme insight lists hold the same objects as `insights`, so serialize
+        # each insight once and splice its bytes into both sections
+        insight_json = {id(i): orjson.dumps(i, default=_serialize_model) for i in insights}
+
+        def insights_array(items: List[InsightData]) -> bytes:
+            return b"[" + b",".join(
+                insight_json.get(id(i)) or orjson.dumps(i, default=_serialize_model) for i in items
+            ) + b"]"
+
+        json_path = self.output_dir / "research_synthesis.json"
+        async with aiofiles.open(json_path, 'wb') as f:
+            # Stream the top-level object: header fields, then one theme at a time
+            await f.write(orjson.dumps(report, default=_serialize_model)[:-1] + b',"themes":[')
+            for n, theme in enumerate(themes):
+                theme_header = orjson.dumps({
                     "theme_name": theme.theme_name,
                     "frequency": theme.frequency,
                     "priority": theme.priority,
                     "summary": theme.summary,
-                    "insights": [insight.dict() for insight in theme.insights]
-                }
-                for theme in themes
-            ],
-            "insights": [insight.dict() for insight in insights]
-        }
-
-        json_path = self.output_dir / "research_synthesis.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+                })
+                await f.write((b"," if n else b"") + theme_header[:-1] + b',"insights":' + insights_array(theme.insights) + b"}")
+            await f.write(b'],"insights":' + insights_array(insights) + b"}")
 
         return json_path
 
     async def _create_executive_summary_new(self, exec_summary: ExecutiveSummary, key_insights: List[KeyInsightCard]) -> Path:
         """Create executive summary with new presentation format"""
-        summary_content = f"""# Executive Summary
-
-**Session ID:** {self.session_id}
-**Generated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
+        summary_content = io.StringIO()
+        summary_content.write(f"""# Executive Summary
 
+{self._session_header}
 ## Research Question
 
 {exec_summary.research_question}
@@ -1189,20 +1716,20 @@ class OutputFormatter(BaseAgent):
 
 ## Key Insights Overview
 
-"""
+""")
         for ki in key_insights:
-            summary_content += f"""
+            summary_content.write(f"""
 ### {ki.insight_number}. {ki.title}
 
 **{ki.main_finding}**
 
-"""
+""")
             if ki.impact_metric:
-                summary_content += f"*{ki.impact_metric}*\n\n"
+                summary_content.write(f"*{ki.impact_metric}*\n\n")
 
         summary_path = self.output_dir / "executive_summary.md"
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            f.write(summary_content)
+        async with aiofiles.open(summary_path, 'w', encoding='utf-8') as f:
+            await f.write(summary_content.getvalue())
 
         return summary_path
     
@@ -1211,159 +1738,133 @@ class OutputFormatter(BaseAgent):
         """Create comprehensive JSON report"""
         report = {
             "session_id": self.session_id,
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": self.generated_at,
             "summary": {
                 "total_insights": len(insights),
                 "themes_identified": len(themes),
                 "personas_created": len(personas)
             },
-            "insights": [insight.dict() for insight in insights],
-            "themes": [
-                {
-                    "theme_name": theme.theme_name,
-                    "frequency": theme.frequency,
-                    "priority": theme.priority,
-                    "summary": theme.summary,
-                    "insights": [insight.dict() for insight in theme.insights]
-                }
-                for theme in themes
-            ],
-            "personas": [persona.dict() for persona in personas]
+            "personas": personas
         }
         
-        json_path = self.output_dir / "research_synthesis.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
-        
-        return json_path
+        return await self._stream_json_report(report, insights, themes)
     
     async def _create_executive_summary(self, themes: List[ThemeCluster], 
                                       personas: List[PersonaData]) -> Path:
         """Create executive summary document"""
-        summary_content = f"""# UX Research Synthesis - Executive Summary
-
-**Session ID:** {self.session_id}
-**Generated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
+        summary_content = io.StringIO()
+        summary_content.write(f"""# UX Research Synthesis - Executive Summary
 
+{self._session_header}
 ## Key Findings
 
 ### Top Themes ({len(themes)} identified)
-"""
+""")
         
         for theme in themes[:5]:  # Top 5 themes
-            summary_content += f"""
+            summary_content.write(f"""
 #### {theme.theme_name} ({theme.priority} Priority)
 - **Frequency:** {theme.frequency} mentions
 - **Summary:** {theme.summary}
-"""
+""")
         
-        summary_content += f"""
+        summary_content.write(f"""
 ### User Personas ({len(personas)} created)
-"""
+""")
         
         for persona in personas:
-            summary_content += f"""
+            summary_content.write(f"""
 #### {persona.name}
 - **Demographics:** {persona.demographics}
 - **Top Goals:** {', '.join(persona.goals[:3])}
 - **Main Pain Points:** {', '.join(persona.pain_points[:3])}
-"""
+""")
         
-        summary_content += """
-## Recommendations
-
-1. **Immediate Actions:** Address high-priority themes with multiple negative sentiments
-2. **Design Focus:** Consider persona needs in upcoming design decisions
-3. **Further Research:** Investigate themes with medium priority for deeper understanding
-
----
-
-*This summary was automatically generated by the UX Research Copilot system.*
-"""
+        summary_content.write(_EXECUTIVE_SUMMARY_FOOTER)
         
         summary_path = self.output_dir / "executive_summary.md"
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            f.write(summary_content)
+        async with aiofiles.open(summary_path, 'w', encoding='utf-8') as f:
+            await f.write(summary_content.getvalue())
         
         return summary_path
     
     async def _create_insights_report(self, insights: List[InsightData], 
                                     themes: List[ThemeCluster]) -> Path:
         """Create detailed insights report"""
-        report_content = f"""# Detailed Insights Report
+        report_content = io.StringIO()
+        report_content.write(f"""# Detailed Insights Report
 
 **Session ID:** {self.session_id}
 **Total Insights:** {len(insights)}
-**Generated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
+**Generated:** {self.generated_at_display}
 
 ## Insights by Theme
-"""
+""")
         
         for theme in themes:
-            report_content += f"""
+            report_content.write(f"""
 ### {theme.theme_name} ({theme.frequency} insights)
 **Priority:** {theme.priority}
 **Summary:** {theme.summary}
 
 **Key Quotes:**
-"""
+""")
             for insight in theme.insights:
-                report_content += f"""
+                report_content.write(f"""
 - "{insight.quote}"
   - **Sentiment:** {insight.sentiment}
   - **Confidence:** {insight.confidence:.2f}
   - **Context:** {insight.context}
-"""
+""")
         
         insights_path = self.output_dir / "detailed_insights.md"
-        with open(insights_path, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        async with aiofiles.open(insights_path, 'w', encoding='utf-8') as f:
+            await f.write(report_content.getvalue())
         
         return insights_path
     
     async def _create_persona_profiles(self, personas: List[PersonaData]) -> Path:
         """Create detailed persona profiles"""
-        profiles_content = f"""# User Persona Profiles
-
-**Session ID:** {self.session_id}
-**Generated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
+        profiles_content = io.StringIO()
+        profiles_content.write(f"""# User Persona Profiles
 
-"""
+{self._session_header}
+""")
         
         for i, persona in enumerate(personas, 1):
-            profiles_content += f"""
+            profiles_content.write(f"""
 ## Persona {i}: {persona.name}
 
 **Demographics:** {persona.demographics}
 
 ### Goals
-"""
+""")
             for goal in persona.goals:
-                profiles_content += f"- {goal}\n"
+                profiles_content.write(f"- {goal}\n")
             
-            profiles_content += """
+            profiles_content.write("""
 ### Pain Points
-"""
+""")
             for pain_point in persona.pain_points:
-                profiles_content += f"- {pain_point}\n"
+                profiles_content.write(f"- {pain_point}\n")
             
-            profiles_content += """
+            profiles_content.write("""
 ### Behaviors
-"""
+""")
             for behavior in persona.behaviors:
-                profiles_content += f"- {behavior}\n"
+                profiles_content.write(f"- {behavior}\n")
             
-            profiles_content += """
+            profiles_content.write("""
 ### Representative Quotes
-"""
+""")
             for quote in persona.quotes:
-                profiles_content += f'- "{quote}"\n'
+                profiles_content.write(f'- "{quote}"\n')
             
-            profiles_content += "\n---\n"
+            profiles_content.write("\n---\n")
         
         personas_path = self.output_dir / "persona_profiles.md"
-        with open(personas_path, 'w', encoding='utf-8') as f:
-            f.write(profiles_content)
+        async with aiofiles.open(personas_path, 'w', encoding='utf-8') as f:
+            await f.write(profiles_content.getvalue())
         
         return personas_path
 
@@ -1372,72 +1873,118 @@ class UXResearchOrchestrator:
     """Main orchestrator that coordinates all agents"""
     
     def __init__(self, config: AgentConfig):
+        # Fail before any agent, client or Redis connection is set up
+        config.validate()
         self.config = config
         self.logger = logging.getLogger("UXResearchOrchestrator")
+        # Every agent's OpenAI client sends requests through this one pool
+        self.http_client = get_http_client()
+        # The agents hold only clients, tokenizers and prompts, so they are built once
+        # and bound to each session with for_session(); OutputFormatter is per run
+        self.ingestor = DocumentIngestor(config, "")
+        self.analyzer = InsightAnalyzer(config, "")
+        self.synthesizer = ThemeSynthesizer(config, "")
+        self.key_insight_synthesizer = KeyInsightSynthesizer(config, "")
+
+    async def aclose(self):
+        """Close the shared HTTP client once this process will run no more sessions"""
+        await self.http_client.aclose()
     
+    def _write_session_fields(self, redis_client: redis.Redis, session_key: str,
+                              previous: Optional[asyncio.Task], fields: Dict[str, Any]) -> asyncio.Task:
+        """HSET session fields in a worker thread once the previous write has landed
+
+        The same fields are published on session:{id}:events in the same round trip,
+        so clients can subscribe to progress instead of polling the hash.
+        """
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(session_key, mapping=fields)
+        if self.config.session_ttl:
+            pipe.expire(session_key, self.config.session_ttl)
+        pipe.publish(f"{session_key}:events", orjson.dumps(fields))
+
+        async def write():
+            if previous:
+                await previous
+            try:
+                await asyncio.to_thread(pipe.execute)
+            except Exception as e:
+                self.logger.warning("Failed to update session %s: %s", session_key, e)
+
+        return asyncio.create_task(write())
+
+    async def process_research_files(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Process files in a new session and report how long the run took"""
+        session_id = f"ux_research_{datetime.now():%Y%m%d_%H%M%S}_{os.urandom(4).hex()}"
+        start = time.perf_counter()
+        results = await self.process_research_files_with_session(file_paths, session_id)
+        results["processing_time"] = time.perf_counter() - start
+        return results
+
     async def process_research_files_with_session(self, file_paths: List[str], session_id: str) -> Dict[str, Any]:
         """Complete research processing workflow"""
         
+        session_key = f"session:{session_id}"
+
         # Initialize Redis client
         redis_client = None
+        status_write = None
         try:
-            redis_client = redis.Redis(
-                host=self.config.redis_host,
-                port=self.config.redis_port,
-                password=self.config.redis_password if self.config.redis_password else None,
-                decode_responses=True
-            )
-            redis_client.ping()
+            # Shares the agents' connection pool, which is pinged once when created
+            redis_client = get_redis_client(self.config)
             self.logger.info("Redis connection established")
-        except:
-            self.logger.warning("Redis not available - continuing without session persistence")
+        except redis.RedisError as e:
+            self.logger.warning("Redis not available - continuing without session persistence: %s", e)
         
         try:
-            # Initialize session
+            self.logger.info("Starting processing for session %s", session_id)
+            
+            # Phase 1: Document Ingestion
+            self.logger.info("Phase 1: Document Ingestion")
+
+            # One clock reading stamps the session and every report of this run
+            started = datetime.now()
+            started_at = started.isoformat()
+
+            # Initialize session (each Redis write below is a single HSET, which
+            # also moves the session on to the next phase; the writes run in the
+            # background, in order, while the phases do their work)
             if redis_client:
-                redis_client.hmset(f"session:{session_id}", {
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
                     'session_id': session_id,
                     'status': 'processing',
-                    'current_phase': 'initialization',
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat(),
+                    'current_phase': 'document_ingestion',
+                    'created_at': started_at,
+                    'updated_at': started_at,
                     'file_count': len(file_paths),
                     'insights_extracted': 0,
                     'themes_identified': 0,
                     'personas_created': 0
                 })
             
-            self.logger.info(f"Starting processing for session {session_id}")
-            
-            # Phase 1: Document Ingestion
-            self.logger.info("Phase 1: Document Ingestion")
-            if redis_client:
-                redis_client.hset(f"session:{session_id}", 'current_phase', 'document_ingestion')
-            
-            ingestor = DocumentIngestor(self.config, session_id)
+            # The vector libraries load in the background while documents are parsed
+            preload = asyncio.create_task(asyncio.to_thread(_preload_vector_libraries))
+
+            ingestor = self.ingestor.for_session(session_id)
             documents = await ingestor.process(file_paths)
             
             if not documents:
                 raise ValueError("No documents were successfully processed")
             
-            self.logger.info(f"Phase 1 complete: {len(documents)} documents processed")
+            self.logger.info("Phase 1 complete: %s documents processed", len(documents))
             
             # Phase 2: Insight Analysis
             self.logger.info("Phase 2: Insight Analysis")
             if redis_client:
-                redis_client.hset(f"session:{session_id}", 'current_phase', 'insight_analysis')
-            
-            analyzer = InsightAnalyzer(self.config, session_id)
-            insights = await analyzer.process(documents)
-            
-            # Update Redis with insights count
-            if redis_client:
-                redis_client.hmset(f"session:{session_id}", {
-                    'insights_extracted': len(insights),
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
+                    'current_phase': 'insight_analysis',
                     'updated_at': datetime.now().isoformat()
                 })
             
-            self.logger.info(f"Phase 2 complete: {len(insights)} insights extracted")
+            analyzer = self.analyzer.for_session(session_id)
+            insights = await analyzer.process(documents)
+            
+            self.logger.info("Phase 2 complete: %s insights extracted", len(insights))
             
             if not insights:
                 self.logger.warning("No insights extracted - creating minimal results")
@@ -1454,57 +2001,78 @@ class UXResearchOrchestrator:
             # Phase 3: Theme Synthesis
             self.logger.info("Phase 3: Theme Synthesis")
             if redis_client:
-                redis_client.hset(f"session:{session_id}", 'current_phase', 'theme_synthesis')
+                # Insights count is recorded together with the phase change
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
+                    'insights_extracted': len(insights),
+                    'current_phase': 'theme_synthesis',
+                    'updated_at': datetime.now().isoformat()
+                })
 
-            synthesizer = ThemeSynthesizer(self.config, session_id)
+            await preload
+            synthesizer = self.synthesizer.for_session(session_id)
             themes = await synthesizer.process(insights)
 
-            # Update Redis with themes count only
-            if redis_client:
-                redis_client.hmset(f"session:{session_id}", {
-                'themes_identified': len(themes),
-                'updated_at': datetime.now().isoformat()
-                })
-
-            self.logger.info(f"Phase 3 complete: {len(themes)} themes")
+            self.logger.info("Phase 3 complete: %s themes", len(themes))
 
             # Phase 3.5: Key Insight Synthesis (NEW)
             self.logger.info("Phase 3.5: Key Insight Synthesis")
             if redis_client:
-                redis_client.hset(f"session:{session_id}", 'current_phase', 'key_insight_synthesis')
+                # Themes count is recorded together with the phase change
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
+                    'themes_identified': len(themes),
+                    'current_phase': 'key_insight_synthesis',
+                    'updated_at': datetime.now().isoformat()
+                })
 
-            key_insight_synthesizer = KeyInsightSynthesizer(self.config, session_id)
-            key_insights, executive_summary = await key_insight_synthesizer.process(insights, themes)
+            # Reports that only need insights and themes are written while the LLM works
+            formatter = OutputFormatter(self.config, session_id, generated_at=started)
+            theme_reports = asyncio.create_task(formatter.write_theme_reports(insights, themes))
 
-            self.logger.info(f"Phase 3.5 complete: {len(key_insights)} key insight cards generated")
+            try:
+                key_insight_synthesizer = self.key_insight_synthesizer.for_session(session_id)
+                key_insights, executive_summary = await key_insight_synthesizer.process(insights, themes)
+            except BaseException:
+                theme_reports.cancel()
+                raise
+
+            self.logger.info("Phase 3.5 complete: %s key insight cards generated", len(key_insights))
 
             # Phase 4: Output Formatting
             self.logger.info("Phase 4: Output Formatting")
             if redis_client:
-                redis_client.hset(f"session:{session_id}", 'current_phase', 'output_formatting')
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
+                    'current_phase': 'output_formatting',
+                    'updated_at': datetime.now().isoformat()
+                })
 
-            formatter = OutputFormatter(self.config, session_id)
             # Pass key insights and executive summary to formatter
-            outputs = await formatter.process_with_key_insights(insights, themes, key_insights, executive_summary)
+            outputs = await formatter.process_with_key_insights(
+                insights, themes, key_insights, executive_summary, theme_reports=theme_reports
+            )
             
-            self.logger.info(f"Phase 4 complete: {len(outputs)} output files created")
+            self.logger.info("Phase 4 complete: %s output files created", len(outputs))
             
-            # Verify files were created
+            # Verify files were created, reading their sizes in one directory scan
+            with os.scandir(formatter.output_dir) as entries:
+                sizes = {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
             for output_type, file_path in outputs.items():
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    self.logger.info(f"✓ {output_type}: {file_path} ({file_size} bytes)")
+                file_size = sizes.get(os.path.basename(file_path))
+                if file_size is not None:
+                    self.logger.info("✓ %s: %s (%s bytes)", output_type, file_path, file_size)
                 else:
-                    self.logger.error(f"✗ {output_type}: {file_path} - FILE NOT FOUND")
+                    self.logger.error("✗ %s: %s - FILE NOT FOUND", output_type, file_path)
             
             # Mark as completed
             if redis_client:
-                redis_client.hmset(f"session:{session_id}", {
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
                     'status': 'completed',
                     'current_phase': 'completed',
                     'updated_at': datetime.now().isoformat()
                 })
             
+            # Theme insights are the same objects as the session insights, so dump each once
+            insight_payloads = {id(insight): insight.model_dump() for insight in insights}
+
             # Create comprehensive results
             results = {
                 "session_id": session_id,
@@ -1515,33 +2083,41 @@ class UXResearchOrchestrator:
                     "personas_count": 0
                 },
                 "outputs": outputs,
-                "insights": [insight.dict() for insight in insights],
+                "insights": [insight_payloads[id(insight)] for insight in insights],
                 "themes": [
                     {
                         "theme_name": theme.theme_name,
                         "frequency": theme.frequency,
                         "priority": theme.priority,
                         "summary": theme.summary,
-                        "insights": [insight.dict() for insight in theme.insights]
+                        "insights": [
+                            insight_payloads.get(id(insight)) or insight.model_dump()
+                            for insight in theme.insights
+                        ]
                     }
                     for theme in themes
                 ],
                 "personas": []
             }
             
-            self.logger.info(f"Processing completed successfully for session {session_id}")
+            # The session reads as completed before the results are handed back
+            if status_write:
+                await status_write
+
+            self.logger.info("Processing completed successfully for session %s", session_id)
             return results
             
         except Exception as e:
-            self.logger.error(f"Error in orchestration: {str(e)}")
+            self.logger.error("Error in orchestration: %s", e)
             
             # Mark as failed in Redis
             if redis_client:
-                redis_client.hmset(f"session:{session_id}", {
+                status_write = self._write_session_fields(redis_client, session_key, status_write, {
                     'status': 'failed',
                     'error_message': str(e),
                     'updated_at': datetime.now().isoformat()
                 })
+                await status_write
             
             raise
 
@@ -1556,22 +2132,30 @@ async def test_orchestrator():
         "sample_data/interview_2.txt"
     ]
     
+    orchestrator = None
     try:
         orchestrator = UXResearchOrchestrator(CONFIG)
         results = await orchestrator.process_research_files(sample_files)
         
-        print(f"✅ Processing completed!")
-        print(f"📊 Session ID: {results['session_id']}")
-        print(f"⏱️ Processing time: {results['processing_time']:.2f} seconds")
-        print(f"🔍 Insights extracted: {results['results']['insights_count']}")
-        print(f"🎯 Themes identified: {results['results']['themes_count']}")
-        print(f"👥 Personas created: {results['results']['personas_count']}")
+        # One write for the whole report rather than a flush per line
+        sys.stdout.write(
+            f"✅ Processing completed!\n"
+            f"📊 Session ID: {results['session_id']}\n"
+            f"⏱️ Processing time: {results['processing_time']:.2f} seconds\n"
+            f"🔍 Insights extracted: {results['results']['insights_count']}\n"
+            f"🎯 Themes identified: {results['results']['themes_count']}\n"
+            f"👥 Personas created: {results['results']['personas_count']}\n"
+        )
+        sys.stdout.flush()
         
         return results
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return None
+    finally:
+        if orchestrator:
+            await orchestrator.aclose()
 
 
 if __name__ == "__main__":
@@ -1580,15 +2164,24 @@ if __name__ == "__main__":
     Usage: python agents.py
     """
     import asyncio
+
+    logging.basicConfig(level=logging.INFO)
     
     print("🧪 Testing UX Research Copilot Agents...")
     
     # Check if configuration is valid
     from config import CONFIG
     
-    if not CONFIG.openai_api_key or CONFIG.openai_api_key == "your_openai_api_key_here":
-        print("❌ Please configure your OpenAI API key in the .env file")
+    try:
+        CONFIG.validate()
+    except ValueError as e:
+        print(f"❌ {e}")
         exit(1)
     
-    # Run the test
-    asyncio.run(test_orchestrator())
\ No newline at end of file
+    # Run the test, on uvloop when it is installed
+    try:
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+    run(test_orchestrator())
\ No newline at end of file
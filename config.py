@@ -4,7 +4,7 @@ from dataclasses import dataclass
 
 load_dotenv()
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AgentConfig:
     """Configuration for the multi-agent system"""
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
@@ -12,11 +12,29 @@ class AgentConfig:
     redis_port: int = int(os.getenv("REDISPORT", os.getenv("REDIS_PORT", "6379")))
     redis_password: str = os.getenv("REDISPASSWORD", os.getenv("REDIS_PASSWORD", ""))
     embedding_model: str = "all-MiniLM-L6-v2"
-    chunk_size: int = 1000
-    chunk_overlap: int = 200
+    chunk_size: int = 250  # tokens
+    chunk_overlap: int = 50  # tokens
+    analysis_batch_tokens: int = int(os.getenv("ANALYSIS_BATCH_TOKENS", "1000"))  # chunk tokens per analysis call
+    pdf_backend: str = os.getenv("PDF_BACKEND", "pdfium")  # "pymupdf" to use PyMuPDF when installed
+    synthesis_model: str = os.getenv("SYNTHESIS_MODEL", "gpt-4o-mini")
+    local_model_url: str = os.getenv("LOCAL_MODEL_URL", "")  # OpenAI-compatible server for every agent, serving synthesis_model
     max_tokens: int = 2000
+    max_prompt_tokens: int = int(os.getenv("MAX_PROMPT_TOKENS", "10000"))  # quote budget for synthesis prompts
     temperature: float = 0.1
+    max_concurrency: int = int(os.getenv("MAX_CONCURRENCY", "8"))
+    llm_cache_ttl: int = int(os.getenv("LLM_CACHE_TTL", "604800"))  # 7 days
+    semantic_cache_dir: str = os.getenv("SEMANTIC_CACHE_DIR", "")  # empty disables the semantic cache
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+    session_ttl: int = int(os.getenv("SESSION_TTL", "2592000"))  # 30 days, 0 disables expiry
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+    def validate(self):
+        """Raise ValueError if the agents cannot run with this configuration"""
+        # A local model server needs no key; embedding-based features are skipped without one
+        if self.local_model_url:
+            return
+        if not self.openai_api_key or self.openai_api_key == "your_openai_api_key_here":
+            raise ValueError("Please configure your OpenAI API key (or LOCAL_MODEL_URL) in the .env file")
+
 # Global configuration instance
 CONFIG = AgentConfig()
\ No newline at end of file
@@ -1,27 +1,55 @@
 # main.py - FastAPI Application
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, FileResponse
 from typing import List as TypingList
 import tempfile
 import os
+import asyncio
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 from pathlib import Path
 from datetime import datetime
+from contextlib import asynccontextmanager
 import redis
+import redis.asyncio as aioredis
+import aiofiles
+import orjson
 
 from config import CONFIG
 from agents import UXResearchOrchestrator
 from models import ProcessingStatus, FeedbackSubmission
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are queued and written by a background thread so
+# logging from request handlers and agents never blocks the event loop
+_log_queue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Give the request handlers one async Redis connection pool for the app's lifetime"""
+    app.state.redis = aioredis.Redis(
+        host=CONFIG.redis_host,
+        port=CONFIG.redis_port,
+        password=CONFIG.redis_password if CONFIG.redis_password else None,
+        decode_responses=True,
+        max_connections=64,
+        socket_connect_timeout=1
+    )
+    yield
+    await app.state.redis.aclose()
+
 app = FastAPI(
     title="UX Research Copilot API", 
     version="1.0.0",
-    description="AI-powered multi-agent system for UX research synthesis"
+    description="AI-powered multi-agent system for UX research synthesis",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -43,15 +71,16 @@ async def process_files(
         raise HTTPException(status_code=400, detail="No files provided")
 
     # Validate OpenAI API key
-    if not CONFIG.openai_api_key:
+    if not CONFIG.openai_api_key and not CONFIG.local_model_url:
         raise HTTPException(
             status_code=500,
-            detail="OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file"
+            detail="OpenAI API key not configured. Please set OPENAI_API_KEY (or LOCAL_MODEL_URL) in your .env file"
         )
 
     # Save uploaded files temporarily
     temp_paths = []
     file_types = []
+    uploads = []
     try:
         for file in files:
             if not file.filename:
@@ -68,16 +97,17 @@ async def process_files(
                 )
 
             file_types.append(file_extension)
+            uploads.append((file, file_extension))
 
-            # Save to temporary location
-            with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=file_extension,
-                prefix="ux_research_"
-            ) as temp_file:
-                content = await file.read()
-                temp_file.write(content)
-                temp_paths.append(temp_file.name)
+        async def save_upload(file: UploadFile, suffix: str):
+            # Save to temporary location without blocking the event loop
+            fd, temp_path = tempfile.mkstemp(suffix=suffix, prefix="ux_research_")
+            os.close(fd)
+            temp_paths.append(temp_path)  # Registered first so errors still clean it up
+            async with aiofiles.open(temp_path, 'wb') as temp_file:
+                await temp_file.write(await file.read())
+
+        await asyncio.gather(*(save_upload(file, suffix) for file, suffix in uploads))
         
         # Generate session ID directly
         import hashlib
@@ -89,19 +119,17 @@ async def process_files(
 
         # Track analytics: file types
         try:
-            redis_client = redis.Redis(
-                host=CONFIG.redis_host,
-                port=CONFIG.redis_port,
-                password=CONFIG.redis_password if CONFIG.redis_password else None,
-                decode_responses=True
-            )
+            redis_client = app.state.redis
 
+            # All counters go to Redis in a single round trip
+            pipe = redis_client.pipeline(transaction=False)
             for file_type in file_types:
-                redis_client.hincrby('analytics:file_types', file_type, 1)
+                pipe.hincrby('analytics:file_types', file_type, 1)
 
             # Track processing session
-            redis_client.incr('analytics:total_sessions')
-            redis_client.hincrby('analytics:sessions_by_date', datetime.now().strftime('%Y-%m-%d'), 1)
+            pipe.incr('analytics:total_sessions')
+            pipe.hincrby('analytics:sessions_by_date', datetime.now().strftime('%Y-%m-%d'), 1)
+            await pipe.execute()
         except Exception as e:
             logger.warning(f"Could not track analytics: {e}")
 
@@ -127,6 +155,16 @@ async def process_files(
                 pass
         raise HTTPException(status_code=500, detail=str(e))
 
+# Built on first use, then shared by every session so its agents are constructed once
+_orchestrator = None
+
+def get_orchestrator() -> UXResearchOrchestrator:
+    """Return the process-wide orchestrator"""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = UXResearchOrchestrator(CONFIG)
+    return _orchestrator
+
 async def process_files_background(file_paths: TypingList[str], session_id: str):
     """Background task for file processing"""
     import redis
@@ -134,31 +172,26 @@ async def process_files_background(file_paths: TypingList[str], session_id: str)
     # Initialize Redis connection
     redis_client = None
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
-        redis_client.ping()
-    except:
-        logger.warning("Redis connection failed - continuing without session persistence")
+        redis_client = app.state.redis
+        await redis_client.ping()
+    except redis.RedisError as e:
+        redis_client = None
+        logger.warning(f"Redis connection failed - continuing without session persistence: {e}")
     
     try:
         # Update status to processing
         if redis_client:
-            redis_client.hmset(f"session:{session_id}", {
+            await redis_client.hset(f"session:{session_id}", mapping={
                 'status': 'processing',
                 'updated_at': datetime.now().isoformat()
             })
         
         # Process files
-        orchestrator = UXResearchOrchestrator(CONFIG)
-        results = await orchestrator.process_research_files_with_session(file_paths, session_id)
+        results = await get_orchestrator().process_research_files_with_session(file_paths, session_id)
         
         # Update status to completed with results summary
         if redis_client:
-            redis_client.hmset(f"session:{session_id}", {
+            await redis_client.hset(f"session:{session_id}", mapping={
                 'status': 'completed',
                 'updated_at': datetime.now().isoformat(),
                 'insights_count': results.get('results', {}).get('insights_count', 0),
@@ -173,7 +206,7 @@ async def process_files_background(file_paths: TypingList[str], session_id: str)
         
         # Update status to failed
         if redis_client:
-            redis_client.hmset(f"session:{session_id}", {
+            await redis_client.hset(f"session:{session_id}", mapping={
                 'status': 'failed',
                 'updated_at': datetime.now().isoformat(),
                 'error_message': str(e)
@@ -190,17 +223,11 @@ async def process_files_background(file_paths: TypingList[str], session_id: str)
 async def get_session_results(session_id: str):
     """Get processing results for a completed session"""
     import redis
-    import json
     
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
         
-        session_data = redis_client.hgetall(f"session:{session_id}")
+        session_data = await redis_client.hgetall(f"session:{session_id}")
         
         if not session_data:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -230,8 +257,8 @@ async def get_session_results(session_id: str):
         # Load JSON report
         json_path = output_dir / "research_synthesis.json"
         if json_path.exists():
-            with open(json_path, 'r', encoding='utf-8') as f:
-                results["full_report"] = json.load(f)
+            async with aiofiles.open(json_path, 'rb') as f:
+                results["full_report"] = orjson.loads(await f.read())
         else:
             logger.error(f"JSON report not found: {json_path}")
             # Create a minimal report from session data
@@ -246,7 +273,7 @@ async def get_session_results(session_id: str):
                 "message": "Some results may be missing due to processing issues"
             }
         
-        return JSONResponse(results)
+        return ORJSONResponse(results)
         
     except redis.ConnectionError:
         raise HTTPException(
@@ -263,14 +290,9 @@ async def get_session_status(session_id: str):
     import redis
     
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
         
-        session_data = redis_client.hgetall(f"session:{session_id}")
+        session_data = await redis_client.hgetall(f"session:{session_id}")
         
         if not session_data:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -327,18 +349,13 @@ async def get_session_status(session_id: str):
 async def save_report(session_id: str, request: dict):
     """Save a report with a custom name"""
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
 
         report_name = request.get('report_name', 'Untitled Report')
 
         # Store the report name and metadata in Redis
         saved_report_key = f"saved_report:{session_id}"
-        redis_client.hset(saved_report_key, mapping={
+        await redis_client.hset(saved_report_key, mapping={
             'report_name': report_name,
             'session_id': session_id,
             'saved_at': datetime.now().isoformat(),
@@ -346,7 +363,7 @@ async def save_report(session_id: str, request: dict):
         })
 
         # Add to list of saved reports
-        redis_client.sadd('saved_reports_list', session_id)
+        await redis_client.sadd('saved_reports_list', session_id)
 
         logger.info(f"Report saved: {report_name} (Session: {session_id})")
 
@@ -365,20 +382,15 @@ async def save_report(session_id: str, request: dict):
 async def get_saved_reports():
     """Get list of all saved reports"""
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
 
-        session_ids = redis_client.smembers('saved_reports_list')
-        reports = []
+        session_ids = await redis_client.smembers('saved_reports_list')
 
+        # Fetch every saved report in one round trip
+        pipe = redis_client.pipeline(transaction=False)
         for session_id in session_ids:
-            report_data = redis_client.hgetall(f"saved_report:{session_id}")
-            if report_data:
-                reports.append(report_data)
+            pipe.hgetall(f"saved_report:{session_id}")
+        reports = [report_data for report_data in await pipe.execute() if report_data]
 
         # Sort by saved_at descending
         reports.sort(key=lambda x: x.get('saved_at', ''), reverse=True)
@@ -433,21 +445,16 @@ async def submit_feedback(submission: FeedbackSubmission):
 
         # Store in Redis for your review
         try:
-            redis_client = redis.Redis(
-                host=CONFIG.redis_host,
-                port=CONFIG.redis_port,
-                password=CONFIG.redis_password if CONFIG.redis_password else None,
-                decode_responses=True
-            )
+            redis_client = app.state.redis
 
             feedback_id = f"feedback:{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            redis_client.hset(feedback_id, mapping={
+            await redis_client.hset(feedback_id, mapping={
                 'name': submission.name,
                 'email': submission.email,
                 'feedback': submission.feedback,
                 'submitted_at': datetime.now().isoformat()
             })
-            redis_client.sadd('feedback_list', feedback_id)
+            await redis_client.sadd('feedback_list', feedback_id)
 
         except Exception as e:
             logger.warning(f"Could not store feedback in Redis: {e}")
@@ -465,27 +472,26 @@ async def submit_feedback(submission: FeedbackSubmission):
 async def track_pageview(data: dict):
     """Track page view"""
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
 
         page = data.get('page', 'unknown')
         user_id = data.get('user_id', 'anonymous')
 
+        # All counters go to Redis in a single round trip
+        pipe = redis_client.pipeline(transaction=False)
+
         # Increment total page views
-        redis_client.incr('analytics:total_pageviews')
+        pipe.incr('analytics:total_pageviews')
 
         # Track by page
-        redis_client.hincrby('analytics:pageviews_by_page', page, 1)
+        pipe.hincrby('analytics:pageviews_by_page', page, 1)
 
         # Track unique visitors (using set)
-        redis_client.sadd('analytics:unique_visitors', user_id)
+        pipe.sadd('analytics:unique_visitors', user_id)
 
         # Track by date
-        redis_client.hincrby('analytics:pageviews_by_date', datetime.now().strftime('%Y-%m-%d'), 1)
+        pipe.hincrby('analytics:pageviews_by_date', datetime.now().strftime('%Y-%m-%d'), 1)
+        await pipe.execute()
 
         return {"status": "success"}
 
@@ -497,20 +503,15 @@ async def track_pageview(data: dict):
 async def get_all_feedback():
     """Get all feedback submissions (admin only)"""
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
+        redis_client = app.state.redis
 
-        feedback_ids = redis_client.smembers('feedback_list')
-        feedback_list = []
+        feedback_ids = await redis_client.smembers('feedback_list')
 
+        # Fetch every submission in one round trip
+        pipe = redis_client.pipeline(transaction=False)
         for feedback_id in feedback_ids:
-            feedback_data = redis_client.hgetall(feedback_id)
-            if feedback_data:
-                feedback_list.append(feedback_data)
+            pipe.hgetall(feedback_id)
+        feedback_list = [feedback_data for feedback_data in await pipe.execute() if feedback_data]
 
         # Sort by submitted_at descending
         feedback_list.sort(key=lambda x: x.get('submitted_at', ''), reverse=True)
@@ -525,30 +526,24 @@ async def get_all_feedback():
 async def get_analytics():
     """Get analytics data (admin only)"""
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
-
-        # Get total page views
-        total_pageviews = redis_client.get('analytics:total_pageviews') or 0
-
-        # Get unique visitors count
-        unique_visitors = redis_client.scard('analytics:unique_visitors') or 0
-
-        # Get total sessions
-        total_sessions = redis_client.get('analytics:total_sessions') or 0
-
-        # Get file types
-        file_types = redis_client.hgetall('analytics:file_types') or {}
-
-        # Get sessions by date (last 30 days)
-        sessions_by_date = redis_client.hgetall('analytics:sessions_by_date') or {}
-
-        # Get pageviews by page
-        pageviews_by_page = redis_client.hgetall('analytics:pageviews_by_page') or {}
+        redis_client = app.state.redis
+
+        # Read every counter in a single round trip
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get('analytics:total_pageviews')
+        pipe.scard('analytics:unique_visitors')
+        pipe.get('analytics:total_sessions')
+        pipe.hgetall('analytics:file_types')
+        pipe.hgetall('analytics:sessions_by_date')  # last 30 days
+        pipe.hgetall('analytics:pageviews_by_page')
+        (total_pageviews, unique_visitors, total_sessions,
+         file_types, sessions_by_date, pageviews_by_page) = await pipe.execute()
+        total_pageviews = total_pageviews or 0
+        unique_visitors = unique_visitors or 0
+        total_sessions = total_sessions or 0
+        file_types = file_types or {}
+        sessions_by_date = sessions_by_date or {}
+        pageviews_by_page = pageviews_by_page or {}
 
         return {
             "total_pageviews": int(total_pageviews),
@@ -577,13 +572,8 @@ async def health_check():
 
     # Check Redis connection
     try:
-        redis_client = redis.Redis(
-            host=CONFIG.redis_host,
-            port=CONFIG.redis_port,
-            password=CONFIG.redis_password if CONFIG.redis_password else None,
-            decode_responses=True
-        )
-        redis_client.ping()
+        redis_client = app.state.redis
+        await redis_client.ping()
         health_status["services"]["redis"] = "connected"
     except:
         health_status["services"]["redis"] = "disconnected"
@@ -591,8 +581,10 @@ async def health_check():
 
     # Check OpenAI API key
     health_status["services"]["openai"] = "configured" if CONFIG.openai_api_key else "missing_api_key"
+    if CONFIG.local_model_url:
+        health_status["services"]["local_model"] = "configured"
 
-    if not CONFIG.openai_api_key:
+    if not CONFIG.openai_api_key and not CONFIG.local_model_url:
         health_status["status"] = "unhealthy"
 
     return health_status
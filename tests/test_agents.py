@@ -1,2 +1,392 @@
+import asyncio
+import json
+import logging
+import re
+
+import pytest
+
+import agents
+from agents import (
+    BaseAgent, Document, DocumentIngestor, InsightAnalyzer, OutputFormatter, SemanticCache, ThemeSynthesizer,
+    UXResearchOrchestrator
+)
+from config import AgentConfig
+from models import InsightData, ThemeCluster
+
+
 def test_placeholder():
     assert True
+
+
+def _insight(quote: str, sentiment: str = "Negative") -> InsightData:
+    return InsightData(quote=quote, theme="Checkout", sentiment=sentiment, confidence=0.8, context="")
+
+
+def _ingestor(chunk_size: int = 250, chunk_overlap: int = 50) -> DocumentIngestor:
+    tiktoken = pytest.importorskip("tiktoken")
+    ingestor = DocumentIngestor.__new__(DocumentIngestor)
+    ingestor.config = AgentConfig(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    ingestor.encoding = tiktoken.get_encoding("cl100k_base")
+    return ingestor
+
+
+def _analyzer(**config) -> InsightAnalyzer:
+    # The pure helpers under test need no LLM client or Redis connection
+    analyzer = InsightAnalyzer.__new__(InsightAnalyzer)
+    analyzer.config = AgentConfig(**config)
+    return analyzer
+
+
+def _chunk(source: str, chunk_id: int, text: str, overlap_chars: int = 0) -> Document:
+    return Document(page_content=text, metadata={"source": source, "chunk_id": chunk_id, "overlap_chars": overlap_chars})
+
+
+@pytest.mark.parametrize("first, second", [
+    ("I like the checkout", "I don't like the checkout"),
+    ("I like the new checkout flow", "I do not like the new checkout flow"),
+    ("The navigation is confusing on mobile", "The navigation is not confusing on mobile"),
+    ("Search never shows what I need", "Search always shows what I need"),
+])
+def test_deduplicate_insights_keeps_negations(first, second):
+    insights = [_insight(first), _insight(second)]
+    assert _analyzer()._deduplicate_insights(insights) == insights
+
+
+@pytest.mark.parametrize("first, second", [
+    ("I can't find the button", "I cannot find the button"),
+    ("I'm trying to pay", "I am trying to pay"),
+    ("I\u2019d use it every day", "I would use it every day"),
+    ("The checkout button is hard to find", "The checkout button is really hard to find"),
+])
+def test_deduplicate_insights_merges_rewordings(first, second):
+    insights = [_insight(first), _insight(second)]
+    assert _analyzer()._deduplicate_insights(insights) == insights[:1]
+
+
+def test_deduplicate_insights_keeps_different_content_words():
+    insights = [_insight("It loads slowly on my phone"), _insight("It loads slowly on my laptop")]
+    assert _analyzer()._deduplicate_insights(insights) == insights
+
+
+def test_deduplicate_insights_drops_exact_and_punctuation_duplicates():
+    insights = [
+        _insight("The checkout button is hard to find"),
+        _insight("  the checkout button is hard to find "),
+        _insight("The checkout button is hard to find!"),
+    ]
+    assert _analyzer()._deduplicate_insights(insights) == insights[:1]
+
+
+def test_deduplicate_insights_requires_matching_sentiment_for_rewordings():
+    insights = [
+        _insight("The checkout button is hard to find", "Negative"),
+        _insight("The checkout button is really hard to find", "Positive"),
+    ]
+    assert _analyzer()._deduplicate_insights(insights) == insights
+
+
+class _EchoAgent(BaseAgent):
+    async def process(self, input_data):
+        return input_data
+
+
+def test_for_session_reconnects_to_redis(monkeypatch):
+    def unavailable(config):
+        raise agents.redis.ConnectionError("down")
+
+    monkeypatch.setattr(agents, "get_redis_client", unavailable)
+    template = _EchoAgent(AgentConfig(), "")
+    assert template.redis_client is None
+
+    client = object()
+    monkeypatch.setattr(agents, "get_redis_client", lambda config: client)
+    agent = template.for_session("session-1")
+    assert agent.redis_client is client
+    assert agent.session_key == "session:session-1"
+    assert template.redis_client is None
+
+
+def test_semantic_cache_save_and_load(tmp_path):
+    pytest.importorskip("faiss")
+    path = tmp_path / "insights"
+
+    first = SemanticCache(path, threshold=0.95)
+    first.load()
+    first.add([1.0, 0.0, 0.0], "checkout")
+    first.save()
+
+    # A second session loaded before the first saved; its save must not drop "checkout"
+    second = SemanticCache(path, threshold=0.95)
+    second.add([0.0, 1.0, 0.0], "navigation")
+    second.save()
+
+    reloaded = SemanticCache(path, threshold=0.95)
+    reloaded.load()
+    assert reloaded.responses == ["checkout", "navigation"]
+    assert reloaded.lookup([0.99, 0.01, 0.0]) == "checkout"
+    assert reloaded.lookup([0.0, 1.0, 0.0]) == "navigation"
+    assert reloaded.lookup([0.0, 0.0, 1.0]) is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_semantic_cache_ignores_index_longer_than_responses(tmp_path):
+    pytest.importorskip("faiss")
+    path = tmp_path / "insights"
+
+    cache = SemanticCache(path, threshold=0.95)
+    cache.add([1.0, 0.0], "checkout")
+    cache.save()
+    cache.responses_path.write_bytes(b"[]")
+
+    reloaded = SemanticCache(path, threshold=0.95)
+    reloaded.load()
+    assert reloaded.index is None
+    assert reloaded.lookup([1.0, 0.0]) is None
+
+
+def _baseline_preprocess_text(text: str) -> str:
+    # _preprocess_text as it was before its regexes were tuned
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?;:\-\'"()]', '', text)
+    text = re.sub(r'^([A-Za-z0-9\s]+):\s*', r'\1: ', text, flags=re.MULTILINE)
+    return text.strip()
+
+
+@pytest.mark.parametrize("text", [
+    "Interviewer:   So, how was it?\n\nP1:\tHonestly... it's *really* hard [to find] the $checkout$ button!!",
+    "  \n Participant 3:I'd pay 50% more \u2014 if it worked \U0001F600 \r\n",
+    "Moderator: Qu\u00e9 tal? Bien, gracias \u2014 caf\u00e9 & cr\u00e8me",
+    "plain <html> & {braces} | pipes ~tilde `backtick\x00\x7f",
+    "\x0b\x0c\x1c\x1d\x1e\x1f\x85 mixed whitespace",
+    "",
+    "   ",
+])
+def test_preprocess_text_matches_baseline(text):
+    assert DocumentIngestor.__new__(DocumentIngestor)._preprocess_text(text) == _baseline_preprocess_text(text)
+
+
+def test_split_text_windows_overlap_by_configured_tokens():
+    ingestor = _ingestor(chunk_size=20, chunk_overlap=5)
+    text = " ".join(f"word{i}" for i in range(200))
+
+    chunks = ingestor._split_text(text)
+    token_ids = ingestor.encoding.encode(text)
+
+    assert len(chunks) == len(range(0, len(token_ids) - 5, 15))
+    assert chunks[0][1] == 0
+    for i, ((previous, _), (following, overlap_chars)) in enumerate(zip(chunks, chunks[1:])):
+        overlap = ingestor.encoding.decode(token_ids[(i + 1) * 15:i * 15 + 20])
+        assert previous.endswith(overlap) and following.startswith(overlap)
+        assert overlap_chars == len(overlap)
+    assert text.startswith(chunks[0][0]) and text.endswith(chunks[-1][0])
+    assert chunks[0][0] + "".join(chunk[overlap_chars:] for chunk, overlap_chars in chunks[1:]) == text
+
+
+def test_split_text_never_cuts_multibyte_characters():
+    ingestor = _ingestor(chunk_size=7, chunk_overlap=2)
+    text = "Ich möchte schnell bezahlen 😀 日本語のテキストはとても分かりにくい " * 10
+
+    chunks = [chunk for chunk, _ in ingestor._split_text(text)]
+
+    assert len(chunks) > 1
+    assert all("\ufffd" not in chunk and chunk in text for chunk in chunks)
+    assert text.startswith(chunks[0]) and text.endswith(chunks[-1])
+
+
+def test_split_text_empty():
+    assert _ingestor()._split_text("") == []
+
+
+def test_worth_analyzing_keeps_short_last_chunks():
+    short = "I hate the checkout"
+    only = Document(page_content=short, metadata={"chunk_id": 0, "total_chunks": 1})
+    last = Document(page_content=short, metadata={"chunk_id": 2, "total_chunks": 3})
+    middle = Document(page_content=short, metadata={"chunk_id": 1, "total_chunks": 3})
+
+    assert InsightAnalyzer._worth_analyzing(only)
+    assert InsightAnalyzer._worth_analyzing(last)
+    assert not InsightAnalyzer._worth_analyzing(middle)
+
+
+def test_batch_chunks_drops_overlap_between_adjacent_chunks():
+    analyzer = _analyzer(chunk_size=250, analysis_batch_tokens=1000)
+    documents = [
+        _chunk("a.txt", 0, "I could not find the checkout button"),
+        _chunk("a.txt", 1, "checkout button so I gave up", overlap_chars=len("checkout button")),
+    ]
+
+    assert analyzer._batch_chunks(documents) == ["I could not find the checkout button so I gave up"]
+
+
+def test_batch_chunks_never_mixes_sources():
+    analyzer = _analyzer(chunk_size=250, analysis_batch_tokens=1000)
+    documents = [
+        _chunk("a.txt", 0, "Participant A"),
+        _chunk("b.txt", 0, "Participant B"),
+        _chunk("b.txt", 1, "B again", overlap_chars=2),
+    ]
+
+    assert analyzer._batch_chunks(documents) == ["Participant A", "Participant Bagain"]
+
+
+def test_batch_chunks_splits_at_batch_size_and_marks_gaps():
+    analyzer = _analyzer(chunk_size=250, analysis_batch_tokens=500)
+    documents = [
+        _chunk("a.txt", 0, "zero"),
+        _chunk("a.txt", 2, "two"),
+        _chunk("a.txt", 3, "three", overlap_chars=1),
+    ]
+
+    assert analyzer._batch_chunks(documents) == ["zero\n\n---\n\ntwo", "three"]
+
+
+def test_validate_accepts_local_model_without_api_key():
+    AgentConfig(openai_api_key="", local_model_url="http://localhost:8000/v1").validate()
+    with pytest.raises(ValueError):
+        AgentConfig(openai_api_key="", local_model_url="").validate()
+
+
+def _formatter(tmp_path) -> OutputFormatter:
+    formatter = OutputFormatter.__new__(OutputFormatter)
+    formatter.session_id = "session-1"
+    formatter.output_dir = tmp_path
+    formatter.generated_at = "2026-01-01T00:00:00"
+    return formatter
+
+
+@pytest.mark.parametrize("theme_count", [0, 1, 2])
+def test_stream_json_report_round_trips_through_json_loads(tmp_path, theme_count):
+    insights = [_insight("The checkout button is hard to find"), _insight("I love the \"saved cards\" option \u2764", "Positive")]
+    themes = [
+        ThemeCluster(theme_name=f"Theme {n}", insights=insights[n:], frequency=2 - n, priority="High", summary="Summary")
+        for n in range(theme_count)
+    ]
+
+    path = asyncio.run(_formatter(tmp_path)._create_json_report(insights, themes, []))
+    report = json.loads(path.read_text(encoding="utf-8"))
+
+    assert report == {
+        "session_id": "session-1",
+        "generated_at": "2026-01-01T00:00:00",
+        "summary": {"total_insights": 2, "themes_identified": theme_count, "personas_created": 0},
+        "personas": [],
+        "themes": [theme.model_dump() for theme in themes],
+        "insights": [insight.model_dump() for insight in insights],
+    }
+
+
+def _theme(name: str, priority: str, frequency: int) -> ThemeCluster:
+    return ThemeCluster(theme_name=name, insights=[], frequency=frequency, priority=priority, summary="")
+
+
+def test_top_themes_ranks_by_priority_then_frequency():
+    themes = [
+        _theme("low", "Low", 9),
+        _theme("medium", "Medium", 1),
+        _theme("high-rare", "High", 2),
+        _theme("unknown", "Urgent", 50),
+        _theme("high-common", "High", 7),
+        _theme("medium-common", "Medium", 4),
+        _theme("high-tie", "High", 2),
+    ]
+
+    top = ThemeSynthesizer._top_themes(themes, 5)
+
+    assert [t.theme_name for t in top] == ["high-common", "high-rare", "high-tie", "medium-common", "medium"]
+    expected = sorted(themes, key=lambda t: ({"High": 0, "Medium": 1, "Low": 2}.get(t.priority, 3), -t.frequency))
+    assert ThemeSynthesizer._top_themes(themes, len(themes)) == expected
+    assert ThemeSynthesizer._top_themes([], 5) == []
+
+
+class _RecordingPipeline:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
+class _RecordingRedis:
+    def __init__(self):
+        self.calls = []
+
+    def pipeline(self, transaction=True):
+        return _RecordingPipeline(self.calls)
+
+
+@pytest.mark.parametrize("session_ttl, expected", [
+    (60, ["hset", "expire", "publish", "execute"]),
+    (0, ["hset", "publish", "execute"]),
+])
+def test_write_session_fields_refreshes_session_ttl(session_ttl, expected):
+    orchestrator = UXResearchOrchestrator.__new__(UXResearchOrchestrator)
+    orchestrator.config = AgentConfig(session_ttl=session_ttl)
+    client = _RecordingRedis()
+
+    async def write():
+        await orchestrator._write_session_fields(client, "session:session-1", None, {"status": "completed"})
+
+    asyncio.run(write())
+    assert client.calls == expected
+
+
+class _FixedSemanticCache:
+    def __init__(self, response):
+        self.response = response
+        self.added = []
+
+    def lookup(self, embedding):
+        return self.response
+
+    def add(self, embedding, response):
+        self.added.append(response)
+
+
+def _cached_response(*quotes: str) -> str:
+    return json.dumps([
+        {"quote": quote, "theme": "Checkout", "sentiment": "Negative", "confidence": 0.8, "context": ""}
+        for quote in quotes
+    ])
+
+
+def _semantic_analyzer(monkeypatch, cached: str, fresh: str) -> InsightAnalyzer:
+    analyzer = _analyzer()
+    analyzer.logger = logging.getLogger("test")
+    analyzer.llm = None
+    analyzer._prompt_prefix = analyzer._prompt_suffix = ""
+    analyzer.semantic_cache = _FixedSemanticCache(cached)
+
+    async def cached_invoke(llm, prompt_text, prompt_version):
+        return fresh
+
+    monkeypatch.setattr(analyzer, "_cached_invoke", cached_invoke)
+    return analyzer
+
+
+def test_quotes_in_chunk_matches_words_not_formatting():
+    chunk = "P1: Honestly, I can't find the checkout button. It's hidden!"
+    assert InsightAnalyzer._quotes_in_chunk([_insight("i cannot find the checkout button")], chunk)
+    assert InsightAnalyzer._quotes_in_chunk([], chunk)
+    assert not InsightAnalyzer._quotes_in_chunk([_insight("I can't find the search bar")], chunk)
+    assert not InsightAnalyzer._quotes_in_chunk([_insight("find the check")], chunk)
+
+
+def test_semantic_cache_hit_is_used_when_its_quotes_are_in_the_chunk(monkeypatch):
+    chunk = "P1: Honestly, I can't find the checkout button."
+    analyzer = _semantic_analyzer(monkeypatch, _cached_response("I can't find the checkout button"), "[]")
+
+    insights = asyncio.run(analyzer._analyze_chunk(chunk, embedding=[1.0]))
+
+    assert [insight.quote for insight in insights] == ["I can't find the checkout button"]
+    assert analyzer.semantic_cache.added == []
+
+
+def test_semantic_cache_hit_quoting_another_transcript_is_not_used(monkeypatch):
+    chunk = "P2: Honestly, I can't find the checkout button."
+    fresh = _cached_response("I can't find the checkout button")
+    analyzer = _semantic_analyzer(monkeypatch, _cached_response("I can't find the search bar"), fresh)
+
+    insights = asyncio.run(analyzer._analyze_chunk(chunk, embedding=[1.0]))
+
+    assert [insight.quote for insight in insights] == ["I can't find the checkout button"]
+    assert analyzer.semantic_cache.added == [fresh]